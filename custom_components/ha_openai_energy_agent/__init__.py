@@ -2,11 +2,14 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
-from typing import Literal
+from collections import OrderedDict
+from collections.abc import AsyncGenerator
+import time
+from typing import Any, Literal
 
-from openai import AsyncAzureOpenAI, AsyncOpenAI
 from openai._exceptions import AuthenticationError, OpenAIError
 from openai.types.chat.chat_completion import (
     ChatCompletion,
@@ -16,9 +19,14 @@ from openai.types.chat.chat_completion import (
 import yaml
 
 from homeassistant.components import conversation
-from homeassistant.components.homeassistant.exposed_entities import async_should_expose
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import ATTR_NAME, CONF_API_KEY, MATCH_ALL
+from homeassistant.const import (
+    ATTR_NAME,
+    CONF_API_KEY,
+    EVENT_HOMEASSISTANT_STOP,
+    MATCH_ALL,
+    Platform,
+)
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import (
     ConfigEntryNotReady,
@@ -27,14 +35,18 @@ from homeassistant.exceptions import (
 )
 from homeassistant.helpers import (
     config_validation as cv,
-    entity_registry as er,
     intent,
     template,
 )
-from homeassistant.helpers.httpx_client import get_async_client
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.util import ulid
 
+try:
+    from homeassistant.helpers import chat_session
+except ImportError:  # Home Assistant < 2025.3 has no chat log to stream into
+    chat_session = None
+
 from .const import (
     CONF_API_VERSION,
     CONF_ATTACH_USERNAME,
@@ -44,9 +56,11 @@ from .const import (
     CONF_CONTEXT_TRUNCATE_STRATEGY,
     CONF_FUNCTIONS,
     CONF_MAX_FUNCTION_CALLS_PER_CONVERSATION,
+    CONF_MAX_PARALLEL_TOOL_CALLS,
     CONF_MAX_TOKENS,
     CONF_ORGANIZATION,
     CONF_PROMPT,
+    CONF_PROMPT_ENTITY_LIMIT,
     CONF_SKIP_AUTHENTICATION,
     CONF_TEMPERATURE,
     CONF_TOP_P,
@@ -60,15 +74,24 @@ from .const import (
     CONF_USE_GET_ATTRIBUTES_TOOL,
     CONF_USE_GET_AUTOMATION_TOOL,
     CONF_USE_ADJUST_AUTOMATION_TOOL,
+    CONF_USE_STATE_HISTORY_TOOL,
+    CONF_USE_ENERGY_SUMMARY_TOOL,
     CONF_ENABLE_CONTINUOUS_CONVERSATION,
+    CONF_STREAM_RESPONSE,
+    CONF_TOOL_RESULT_MAX_BYTES,
+    CONTEXT_SUMMARY_HEADER,
+    CONTEXT_SUMMARY_MESSAGE_CHARS,
+    CONTEXT_SUMMARY_PROMPT,
     DEFAULT_ATTACH_USERNAME,
     DEFAULT_CHAT_MODEL,
     DEFAULT_CONF_FUNCTIONS,
     DEFAULT_CONTEXT_THRESHOLD,
     DEFAULT_CONTEXT_TRUNCATE_STRATEGY,
     DEFAULT_MAX_FUNCTION_CALLS_PER_CONVERSATION,
+    DEFAULT_MAX_PARALLEL_TOOL_CALLS,
     DEFAULT_MAX_TOKENS,
     DEFAULT_PROMPT,
+    DEFAULT_PROMPT_ENTITY_LIMIT,
     DEFAULT_SKIP_AUTHENTICATION,
     DEFAULT_TEMPERATURE,
     DEFAULT_TOP_P,
@@ -82,11 +105,21 @@ from .const import (
     DEFAULT_USE_GET_ATTRIBUTES_TOOL,
     DEFAULT_USE_GET_AUTOMATION_TOOL,
     DEFAULT_USE_ADJUST_AUTOMATION_TOOL,
+    DEFAULT_USE_STATE_HISTORY_TOOL,
+    DEFAULT_USE_ENERGY_SUMMARY_TOOL,
     DEFAULT_ENABLE_CONTINUOUS_CONVERSATION,
+    DEFAULT_STREAM_RESPONSE,
+    DEFAULT_TOOL_RESULT_MAX_BYTES,
+    DATA_AGENT,
     DOMAIN,
     EVENT_CONVERSATION_FINISHED,
     GPT5_FUNCTION_SCHEMAS,
+    PROMPT_CACHE_TIME_BUCKET,
+    PROMPT_ENTITIES_CACHE_SIZE,
+    SIGNAL_PROMPT_TOKENS,
+    TOOL_RESULT_OMITTED,
 )
+from .entity_index import ExposedEntities, ExposedEntityIndex
 from .exceptions import (
     FunctionLoadFailed,
     FunctionNotFound,
@@ -94,21 +127,38 @@ from .exceptions import (
     ParseArgumentsFailed,
     TokenLengthExceededError,
 )
-from .helpers import get_function_executor, is_azure, validate_authentication
+from .helpers import (
+    SQLITE_POOL,
+    StreamedCompletion,
+    create_client,
+    encode_tool_result,
+    get_function_executor,
+    validate_authentication,
+)
+from .history import ConversationHistory, history_store
 from .services import async_setup_services
+from .tokens import (
+    async_load_tokenizer,
+    count_entities_tokens,
+    count_messages_tokens,
+    count_tools_tokens,
+    token_breakdown,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
 CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
-
-# hass.data key for agent.
-DATA_AGENT = "agent"
+PLATFORMS = [Platform.SENSOR]
 
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up OpenAI Energy Management Agent."""
     await async_setup_services(hass, config)
+    await get_function_executor("native").async_setup(hass)
+    hass.bus.async_listen_once(
+        EVENT_HOMEASSISTANT_STOP, lambda event: SQLITE_POOL.shutdown()
+    )
     return True
 
 
@@ -132,23 +182,96 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     except OpenAIError as err:
         raise ConfigEntryNotReady(err) from err
 
+    async_load_tokenizer(hass)
     agent = OpenAIAgent(hass, entry)
+    await agent.history.async_load()
+    agent.exposed_entity_index.async_start()
+    entry.async_on_unload(agent.exposed_entity_index.async_stop)
 
     data = hass.data.setdefault(DOMAIN, {}).setdefault(entry.entry_id, {})
     data[CONF_API_KEY] = entry.data[CONF_API_KEY]
     data[DATA_AGENT] = agent
 
     conversation.async_set_agent(hass, entry, agent)
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload OpenAI Energy Management Agent."""
-    hass.data[DOMAIN].pop(entry.entry_id)
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
+    data = hass.data[DOMAIN].pop(entry.entry_id)
     conversation.async_unset_agent(hass, entry)
+    await data[DATA_AGENT].history.async_flush()
     return True
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove persisted conversation history."""
+    await history_store(hass, entry.entry_id).async_remove()
+
+
+# Map of tool configs to function schemas, executors and default enablement
+TOOLS = {
+    CONF_USE_EXECUTE_SERVICES_TOOL: {
+        "schema": GPT5_FUNCTION_SCHEMAS["execute_services"],
+        "executor": {"type": "native", "name": "execute_service"},
+        "default": DEFAULT_USE_EXECUTE_SERVICES_TOOL,
+    },
+    CONF_USE_GET_ENERGY_DATA_TOOL: {
+        "schema": GPT5_FUNCTION_SCHEMAS["get_energy_statistic_ids"],
+        "executor": {"type": "native", "name": "get_energy"},
+        "default": DEFAULT_USE_GET_ENERGY_DATA_TOOL,
+    },
+    CONF_USE_GET_STATISTICS_TOOL: {
+        "schema": GPT5_FUNCTION_SCHEMAS["get_statistics"],
+        "executor": {"type": "native", "name": "get_statistics"},
+        "default": DEFAULT_USE_GET_STATISTICS_TOOL,
+    },
+    CONF_USE_ADD_AUTOMATION_TOOL: {
+        "schema": GPT5_FUNCTION_SCHEMAS["add_automation"],
+        "executor": {"type": "native", "name": "add_automation"},
+        "default": DEFAULT_USE_ADD_AUTOMATION_TOOL,
+    },
+    CONF_USE_CREATE_EVENT_TOOL: {
+        "schema": GPT5_FUNCTION_SCHEMAS["create_event"],
+        "executor": {"type": "native", "name": "create_calendar_event"},
+        "default": DEFAULT_USE_CREATE_EVENT_TOOL,
+    },
+    CONF_USE_GET_EVENTS_TOOL: {
+        "schema": GPT5_FUNCTION_SCHEMAS["get_events"],
+        "executor": {"type": "native", "name": "get_calendar_events"},
+        "default": DEFAULT_USE_GET_EVENTS_TOOL,
+    },
+    CONF_USE_GET_ATTRIBUTES_TOOL: {
+        "schema": GPT5_FUNCTION_SCHEMAS["get_attributes"],
+        "executor": {"type": "template", "value_template": "{{ states[entity_id] }}"},
+        "default": DEFAULT_USE_GET_ATTRIBUTES_TOOL,
+    },
+    CONF_USE_GET_AUTOMATION_TOOL: {
+        "schema": GPT5_FUNCTION_SCHEMAS["get_automation"],
+        "executor": {"type": "native", "name": "get_automation"},
+        "default": DEFAULT_USE_GET_AUTOMATION_TOOL,
+    },
+    CONF_USE_ADJUST_AUTOMATION_TOOL: {
+        "schema": GPT5_FUNCTION_SCHEMAS["adjust_automation"],
+        "executor": {"type": "native", "name": "adjust_automation"},
+        "default": DEFAULT_USE_ADJUST_AUTOMATION_TOOL,
+    },
+    CONF_USE_STATE_HISTORY_TOOL: {
+        "schema": GPT5_FUNCTION_SCHEMAS["get_state_history"],
+        "executor": {"type": "native", "name": "get_state_history"},
+        "default": DEFAULT_USE_STATE_HISTORY_TOOL,
+    },
+    CONF_USE_ENERGY_SUMMARY_TOOL: {
+        "schema": GPT5_FUNCTION_SCHEMAS["energy_summary"],
+        "executor": {"type": "native", "name": "energy_summary"},
+        "default": DEFAULT_USE_ENERGY_SUMMARY_TOOL,
+    },
+}
+
+
 class OpenAIAgent(conversation.AbstractConversationAgent):
     """OpenAI Energy Management conversation agent."""
 
@@ -156,23 +279,22 @@ class OpenAIAgent(conversation.AbstractConversationAgent):
         """Initialize the Energy Management AI agent."""
         self.hass = hass
         self.entry = entry
-        self.history: dict[str, list[dict]] = {}
-        base_url = entry.data.get(CONF_BASE_URL)
-        if is_azure(base_url):
-            self.client = AsyncAzureOpenAI(
-                api_key=entry.data[CONF_API_KEY],
-                azure_endpoint=base_url,
-                api_version=entry.data.get(CONF_API_VERSION),
-                organization=entry.data.get(CONF_ORGANIZATION),
-                http_client=get_async_client(hass),
-            )
-        else:
-            self.client = AsyncOpenAI(
-                api_key=entry.data[CONF_API_KEY],
-                base_url=base_url,
-                organization=entry.data.get(CONF_ORGANIZATION),
-                http_client=get_async_client(hass),
-            )
+        self.history = ConversationHistory(hass, entry)
+        self.exposed_entity_index = ExposedEntityIndex(hass)
+        self._prompt_template: template.Template | None = None
+        self._rendered_prompt: tuple[tuple, str] | None = None
+        # System prompt -> the entities rendered into it
+        self._prompt_entities: OrderedDict[str, ExposedEntities] = OrderedDict()
+        # Token counts of the last counted entities, by snapshot version
+        self._entity_tokens: tuple[Any, dict[str, int]] | None = None
+        self._tool_registry: ToolRegistry | None = None
+        self.client = create_client(
+            hass,
+            entry.data[CONF_API_KEY],
+            entry.data.get(CONF_BASE_URL),
+            entry.data.get(CONF_API_VERSION),
+            entry.data.get(CONF_ORGANIZATION),
+        )
         # Cache current platform data which gets added to each request (caching done by library)
         _ = hass.async_add_executor_job(self.client.platform_headers)
 
@@ -191,9 +313,16 @@ class OpenAIAgent(conversation.AbstractConversationAgent):
             CONF_ENABLE_CONTINUOUS_CONVERSATION, DEFAULT_ENABLE_CONTINUOUS_CONVERSATION
         )
         
-        if enable_continuous and user_input.conversation_id in self.history:
+        history = (
+            self.history.async_get(user_input.conversation_id)
+            if enable_continuous
+            else None
+        )
+        if history is not None:
             conversation_id = user_input.conversation_id
-            messages = self.history[conversation_id].copy()
+            # The turn is built on a copy that is only stored once it succeeds, a
+            # failure at any point never leaves a partial turn in the history
+            messages = list(history)
             # Update system message with current device states
             try:
                 updated_system_message = self._generate_system_message(
@@ -205,7 +334,8 @@ class OpenAIAgent(conversation.AbstractConversationAgent):
         else:
             # Start new conversation or continuous conversation is disabled
             conversation_id = ulid.ulid() if not enable_continuous else user_input.conversation_id or ulid.ulid()
-            user_input.conversation_id = conversation_id
+            # user_input keeps the pipeline's id, its chat log receives the stream,
+            # while requests are sent with conversation_id, which is never None
             try:
                 system_message = self._generate_system_message(
                     exposed_entities, user_input
@@ -230,7 +360,9 @@ class OpenAIAgent(conversation.AbstractConversationAgent):
         messages.append(user_message)
 
         try:
-            query_response = await self.query(user_input, messages, exposed_entities, 0)
+            query_response = await self.query(
+                user_input, conversation_id, messages, exposed_entities, 0
+            )
         except OpenAIError as err:
             _LOGGER.error(err)
             intent_response = intent.IntentResponse(language=user_input.language)
@@ -256,7 +388,7 @@ class OpenAIAgent(conversation.AbstractConversationAgent):
         
         # Only store history if continuous conversation is enabled
         if enable_continuous:
-            self.history[conversation_id] = messages
+            self.history.async_set(conversation_id, messages)
 
         self.hass.bus.async_fire(
             EVENT_CONVERSATION_FINISHED,
@@ -277,9 +409,36 @@ class OpenAIAgent(conversation.AbstractConversationAgent):
         self, exposed_entities, user_input: conversation.ConversationInput
     ):
         raw_prompt = self.entry.options.get(CONF_PROMPT, DEFAULT_PROMPT)
+        limit = self.entry.options.get(
+            CONF_PROMPT_ENTITY_LIMIT, DEFAULT_PROMPT_ENTITY_LIMIT
+        )
+        if limit > 0 and len(exposed_entities) > limit:
+            # Only the prompt is narrowed, tools validate against every exposed entity
+            exposed_entities = self.exposed_entity_index.async_rank(
+                user_input.text, limit
+            )
         prompt = self._async_generate_prompt(raw_prompt, exposed_entities, user_input)
+        self._prompt_entities[prompt] = exposed_entities
+        self._prompt_entities.move_to_end(prompt)
+        while len(self._prompt_entities) > PROMPT_ENTITIES_CACHE_SIZE:
+            self._prompt_entities.popitem(last=False)
         return {"role": "system", "content": prompt}
 
+    def _prompt_entity_tokens(self, messages, exposed_entities) -> dict[str, int]:
+        """Return the tokens of the entities rendered into the system prompt."""
+        if messages and isinstance(messages[0].get("content"), str):
+            exposed_entities = self._prompt_entities.get(
+                messages[0]["content"], exposed_entities
+            )
+        version = getattr(exposed_entities, "version", None)
+        if (
+            version is None
+            or self._entity_tokens is None
+            or self._entity_tokens[0] != version
+        ):
+            self._entity_tokens = (version, count_entities_tokens(exposed_entities))
+        return self._entity_tokens[1]
+
     def _async_generate_prompt(
         self,
         raw_prompt: str,
@@ -287,7 +446,28 @@ class OpenAIAgent(conversation.AbstractConversationAgent):
         user_input: conversation.ConversationInput,
     ) -> str:
         """Generate a prompt for the user."""
-        return template.Template(raw_prompt, self.hass).async_render(
+        # now() in the prompt is only refreshed once per time bucket
+        cache_key = (
+            raw_prompt,
+            getattr(exposed_entities, "version", None),
+            user_input.device_id,
+            self.hass.config.location_name,
+            int(time.time() // PROMPT_CACHE_TIME_BUCKET),
+        )
+        if (
+            self._rendered_prompt is not None
+            and self._rendered_prompt[0] == cache_key
+            and cache_key[1] is not None
+        ):
+            return self._rendered_prompt[1]
+
+        if (
+            self._prompt_template is None
+            or self._prompt_template.template != raw_prompt
+        ):
+            self._prompt_template = template.Template(raw_prompt, self.hass)
+
+        prompt = self._prompt_template.async_render(
             {
                 "ha_name": self.hass.config.location_name,
                 "exposed_entities": exposed_entities,
@@ -295,135 +475,141 @@ class OpenAIAgent(conversation.AbstractConversationAgent):
             },
             parse_result=False,
         )
-
-    def get_exposed_entities(self):
-        states = [
-            state
-            for state in self.hass.states.async_all()
-            if async_should_expose(self.hass, conversation.DOMAIN, state.entity_id)
-        ]
-        entity_registry = er.async_get(self.hass)
-        exposed_entities = []
-        for state in states:
-            entity_id = state.entity_id
-            entity = entity_registry.async_get(entity_id)
-
-            aliases = []
-            if entity and entity.aliases:
-                aliases = entity.aliases
-
-            exposed_entities.append(
-                {
-                    "entity_id": entity_id,
-                    "name": state.name,
-                    "state": self.hass.states.get(entity_id).state,
-                    "aliases": aliases,
-                }
-            )
-        return exposed_entities
+        self._rendered_prompt = (cache_key, prompt)
+        return prompt
+
+    def get_exposed_entities(self) -> ExposedEntities:
+        """Return the current snapshot of exposed entities."""
+        return self.exposed_entity_index.async_get_snapshot()
+
+    def get_tool_registry(self) -> ToolRegistry:
+        """Return the enabled tools, recompiled only when the tool toggles change."""
+        key = tuple(
+            self.entry.options.get(tool_conf, tool_data["default"])
+            for tool_conf, tool_data in TOOLS.items()
+        )
+        if self._tool_registry is None or self._tool_registry.key != key:
+            self._tool_registry = ToolRegistry(key)
+        return self._tool_registry
 
     def get_functions(self):
         """Get enabled functions based on individual tool toggles."""
-        enabled_functions = []
-        
-        # Map of tool configs to function schemas and executors
-        tool_mapping = {
-            CONF_USE_EXECUTE_SERVICES_TOOL: {
-                "schema": GPT5_FUNCTION_SCHEMAS["execute_services"],
-                "executor": {"type": "native", "name": "execute_service"}
-            },
-            CONF_USE_GET_ENERGY_DATA_TOOL: {
-                "schema": GPT5_FUNCTION_SCHEMAS["get_energy_statistic_ids"],
-                "executor": {"type": "native", "name": "get_energy"}
-            },
-            CONF_USE_GET_STATISTICS_TOOL: {
-                "schema": GPT5_FUNCTION_SCHEMAS["get_statistics"],
-                "executor": {"type": "native", "name": "get_statistics"}
-            },
-            CONF_USE_ADD_AUTOMATION_TOOL: {
-                "schema": GPT5_FUNCTION_SCHEMAS["add_automation"],
-                "executor": {"type": "native", "name": "add_automation"}
-            },
-            CONF_USE_CREATE_EVENT_TOOL: {
-                "schema": GPT5_FUNCTION_SCHEMAS["create_event"],
-                "executor": {"type": "native", "name": "create_calendar_event"}
-            },
-            CONF_USE_GET_EVENTS_TOOL: {
-                "schema": GPT5_FUNCTION_SCHEMAS["get_events"],
-                "executor": {"type": "native", "name": "get_calendar_events"}
-            },
-            CONF_USE_GET_ATTRIBUTES_TOOL: {
-                "schema": GPT5_FUNCTION_SCHEMAS["get_attributes"],
-                "executor": {"type": "template", "value_template": "{{ states[entity_id] }}"}
-            },
-            CONF_USE_GET_AUTOMATION_TOOL: {
-                "schema": GPT5_FUNCTION_SCHEMAS["get_automation"],
-                "executor": {"type": "native", "name": "get_automation"}
-            },
-            CONF_USE_ADJUST_AUTOMATION_TOOL: {
-                "schema": GPT5_FUNCTION_SCHEMAS["adjust_automation"],
-                "executor": {"type": "native", "name": "adjust_automation"}
-            }
-        }
-        
-        # Check each tool toggle and add enabled functions
-        for tool_conf, tool_data in tool_mapping.items():
-            # Get the default value for each tool
-            default_value = {
-                CONF_USE_EXECUTE_SERVICES_TOOL: DEFAULT_USE_EXECUTE_SERVICES_TOOL,
-                CONF_USE_GET_ENERGY_DATA_TOOL: DEFAULT_USE_GET_ENERGY_DATA_TOOL,
-                CONF_USE_GET_STATISTICS_TOOL: DEFAULT_USE_GET_STATISTICS_TOOL,
-                CONF_USE_ADD_AUTOMATION_TOOL: DEFAULT_USE_ADD_AUTOMATION_TOOL,
-                CONF_USE_CREATE_EVENT_TOOL: DEFAULT_USE_CREATE_EVENT_TOOL,
-                CONF_USE_GET_EVENTS_TOOL: DEFAULT_USE_GET_EVENTS_TOOL,
-                CONF_USE_GET_ATTRIBUTES_TOOL: DEFAULT_USE_GET_ATTRIBUTES_TOOL,
-                CONF_USE_GET_AUTOMATION_TOOL: DEFAULT_USE_GET_AUTOMATION_TOOL,
-                CONF_USE_ADJUST_AUTOMATION_TOOL: DEFAULT_USE_ADJUST_AUTOMATION_TOOL,
-            }.get(tool_conf, False)
-            
-            if self.entry.options.get(tool_conf, default_value):
-                try:
-                    function_executor = get_function_executor(tool_data["executor"]["type"])
-                    processed_executor = function_executor.to_arguments(tool_data["executor"])
-                    
-                    enabled_functions.append({
-                        "spec": tool_data["schema"],
-                        "function": processed_executor
-                    })
-                except (InvalidFunction, FunctionNotFound) as e:
-                    _LOGGER.warning("Failed to load function %s: %s", tool_data["schema"]["name"], e)
-                    continue
-                except Exception as e:
-                    _LOGGER.warning("Unexpected error loading function %s: %s", tool_data["schema"]["name"], e)
-                    continue
-        
-        return enabled_functions
+        return self.get_tool_registry().functions
 
     async def truncate_message_history(
-        self, messages, exposed_entities, user_input: conversation.ConversationInput
+        self,
+        messages,
+        exposed_entities,
+        user_input: conversation.ConversationInput,
+        conversation_id: str,
     ):
         """Truncate message history."""
         strategy = self.entry.options.get(
             CONF_CONTEXT_TRUNCATE_STRATEGY, DEFAULT_CONTEXT_TRUNCATE_STRATEGY
         )
+        budget = self.entry.options.get(
+            CONF_CONTEXT_THRESHOLD, DEFAULT_CONTEXT_THRESHOLD
+        ) - self.get_tool_registry().token_count
+
+        last_user_message_index = None
+        for i in reversed(range(len(messages))):
+            if messages[i]["role"] == "user":
+                last_user_message_index = i
+                break
+
+        if last_user_message_index is None:
+            return
 
         if strategy == "clear":
-            last_user_message_index = None
-            for i in reversed(range(len(messages))):
-                if messages[i]["role"] == "user":
-                    last_user_message_index = i
-                    break
-
-            if last_user_message_index is not None:
-                del messages[1:last_user_message_index]
-                # refresh system prompt when all messages are deleted
-                messages[0] = self._generate_system_message(
-                    exposed_entities, user_input
-                )
+            del messages[1:last_user_message_index]
+            # refresh system prompt when all messages are deleted
+            messages[0] = self._generate_system_message(
+                exposed_entities, user_input
+            )
+        elif strategy == "sliding_window":
+            self._drop_oldest_turns(messages, budget)
+        elif strategy == "drop_tool_results":
+            for i in range(1, last_user_message_index):
+                if count_messages_tokens(messages) <= budget:
+                    return
+                if messages[i]["role"] in ("tool", "function"):
+                    messages[i] = {**messages[i], "content": TOOL_RESULT_OMITTED}
+            self._drop_oldest_turns(messages, budget)
+        elif strategy == "summarize":
+            await self._summarize_history(
+                messages, last_user_message_index, conversation_id, budget
+            )
+
+    @staticmethod
+    def _drop_oldest_turns(messages, budget: int) -> None:
+        """Drop whole turns, oldest first, until the messages fit the budget."""
+        while count_messages_tokens(messages) > budget:
+            user_message_indexes = [
+                i for i, message in enumerate(messages) if message["role"] == "user"
+            ]
+            if len(user_message_indexes) < 2:
+                return
+            del messages[user_message_indexes[0] : user_message_indexes[1]]
+
+    @staticmethod
+    def _is_summary(message: dict) -> bool:
+        """Return True for a summary that replaced earlier turns."""
+        content = message.get("content")
+        return (
+            message["role"] == "system"
+            and isinstance(content, str)
+            and content.startswith(CONTEXT_SUMMARY_HEADER)
+        )
+
+    async def _summarize_history(
+        self,
+        messages,
+        last_user_message_index: int,
+        conversation_id: str,
+        budget: int,
+    ) -> None:
+        """Replace the turns before the current one with a summary."""
+        older_messages = messages[1:last_user_message_index]
+        # Summarizing only the previous summary costs a request and saves nothing,
+        # which happens on every tool hop once the current turn alone is too long
+        if all(self._is_summary(message) for message in older_messages):
+            self._drop_oldest_turns(messages, budget)
+            return
+        transcript = "\n".join(
+            f"{message['role']}: {message['content'][:CONTEXT_SUMMARY_MESSAGE_CHARS]}"
+            for message in older_messages
+            if isinstance(message.get("content"), str) and message["content"]
+        )
+        if not transcript:
+            self._drop_oldest_turns(messages, budget)
+            return
+
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.entry.options.get(CONF_CHAT_MODEL, DEFAULT_CHAT_MODEL),
+                messages=[
+                    {"role": "system", "content": CONTEXT_SUMMARY_PROMPT},
+                    {"role": "user", "content": transcript},
+                ],
+                user=conversation_id,
+            )
+        except OpenAIError as err:
+            _LOGGER.warning("Failed to summarize conversation history: %s", err)
+            self._drop_oldest_turns(messages, budget)
+            return
+
+        messages[1:last_user_message_index] = [
+            {
+                "role": "system",
+                "content": CONTEXT_SUMMARY_HEADER
+                + (response.choices[0].message.content or ""),
+            }
+        ]
 
     async def query(
         self,
         user_input: conversation.ConversationInput,
+        conversation_id: str,
         messages,
         exposed_entities,
         n_requests,
@@ -436,25 +622,84 @@ class OpenAIAgent(conversation.AbstractConversationAgent):
         context_threshold = self.entry.options.get(
             CONF_CONTEXT_THRESHOLD, DEFAULT_CONTEXT_THRESHOLD
         )
-        functions = list(map(lambda s: s["spec"], self.get_functions()))
-        
+        tool_registry = self.get_tool_registry()
+
+        # Keep the request within the threshold before paying for the tokens
+        if (
+            count_messages_tokens(messages) + tool_registry.token_count
+            > context_threshold
+        ):
+            await self.truncate_message_history(
+                messages, exposed_entities, user_input, conversation_id
+            )
+
+        async_dispatcher_send(
+            self.hass,
+            SIGNAL_PROMPT_TOKENS.format(self.entry.entry_id),
+            token_breakdown(
+                messages,
+                tool_registry.token_counts,
+                tool_registry.token_count,
+                self._prompt_entity_tokens(messages, exposed_entities),
+            ),
+        )
+
         _LOGGER.info("Prompt for %s: %s", model, json.dumps(messages))
 
         # Check if this is GPT-5 or o1 model that requires max_completion_tokens
         if model.startswith("gpt-5") or model.startswith("o1"):
             return await self._query_gpt5(
-                user_input, messages, exposed_entities, n_requests, model, max_tokens, 
-                top_p, temperature, context_threshold, functions
+                user_input, conversation_id, messages, exposed_entities, n_requests,
+                model, max_tokens, top_p, temperature, context_threshold, tool_registry
             )
         else:
             return await self._query_legacy(
-                user_input, messages, exposed_entities, n_requests, model, max_tokens,
-                top_p, temperature, context_threshold, functions
+                user_input, conversation_id, messages, exposed_entities, n_requests,
+                model, max_tokens, top_p, temperature, context_threshold, tool_registry
             )
 
+    async def _async_create_completion(
+        self, user_input: conversation.ConversationInput, **kwargs
+    ) -> ChatCompletion:
+        """Create a chat completion, streaming text deltas when enabled."""
+        if not self.entry.options.get(CONF_STREAM_RESPONSE, DEFAULT_STREAM_RESPONSE):
+            return await self.client.chat.completions.create(**kwargs)
+
+        stream = await self.client.chat.completions.create(
+            stream=True, stream_options={"include_usage": True}, **kwargs
+        )
+        completion = StreamedCompletion()
+        deltas = self._async_stream_deltas(stream, completion)
+
+        if chat_session is None:
+            async for _ in deltas:
+                pass
+        else:
+            with (
+                chat_session.async_get_chat_session(
+                    self.hass, user_input.conversation_id
+                ) as session,
+                conversation.async_get_chat_log(self.hass, session) as chat_log,
+            ):
+                async for _ in chat_log.async_add_delta_content_stream(
+                    self.entry.entry_id, deltas
+                ):
+                    pass
+
+        return completion.as_completion()
+
+    async def _async_stream_deltas(
+        self, stream, completion: StreamedCompletion
+    ) -> AsyncGenerator[dict[str, str], None]:
+        """Feed chunks into the completion and yield chat log text deltas."""
+        yield {"role": "assistant"}
+        async for chunk in stream:
+            if content := completion.add_chunk(chunk):
+                yield {"content": content}
+
     async def _query_gpt5(
-        self, user_input, messages, exposed_entities, n_requests, model, max_tokens,
-        top_p, temperature, context_threshold, functions
+        self, user_input, conversation_id, messages, exposed_entities, n_requests,
+        model, max_tokens, top_p, temperature, context_threshold, tool_registry
     ) -> OpenAIQueryResponse:
         """Handle GPT-5 API calls using chat.completions.create() with max_completion_tokens."""
         function_call = "auto"
@@ -465,49 +710,64 @@ class OpenAIAgent(conversation.AbstractConversationAgent):
             function_call = "none"
 
         # GPT-5 requires tools format (not functions format) to support strict parameter
-        if len(functions) == 0:
+        if len(tool_registry.specs) == 0:
             tool_kwargs = {}
         else:
             tool_kwargs = {
-                "tools": [{"type": "function", "function": func} for func in functions],
+                "tools": tool_registry.tools,
                 "tool_choice": function_call,
             }
 
         # GPT-5 uses max_completion_tokens instead of max_tokens
-        response: ChatCompletion = await self.client.chat.completions.create(
+        response: ChatCompletion = await self._async_create_completion(
+            user_input,
             model=model,
             messages=messages,
             max_completion_tokens=max_tokens,
             top_p=top_p,
             temperature=temperature,
-            user=user_input.conversation_id,
+            user=conversation_id,
             **tool_kwargs,
         )
 
         _LOGGER.info("GPT-5 Response: %s", json.dumps(response.model_dump(exclude_none=True)))
 
-        if response.usage.total_tokens > context_threshold:
-            await self.truncate_message_history(messages, exposed_entities, user_input)
+        if response.usage and response.usage.total_tokens > context_threshold:
+            await self.truncate_message_history(
+                messages, exposed_entities, user_input, conversation_id
+            )
 
         choice: Choice = response.choices[0]
         message = choice.message
 
         if choice.finish_reason == "function_call":
             return await self.execute_function_call(
-                user_input, messages, message, exposed_entities, n_requests + 1
+                user_input,
+                conversation_id,
+                messages,
+                message,
+                exposed_entities,
+                n_requests + 1,
             )
         if choice.finish_reason == "tool_calls":
             return await self.execute_tool_calls(
-                user_input, messages, message, exposed_entities, n_requests + 1
+                user_input,
+                conversation_id,
+                messages,
+                message,
+                exposed_entities,
+                n_requests + 1,
             )
         if choice.finish_reason == "length":
-            raise TokenLengthExceededError(response.usage.completion_tokens)
+            raise TokenLengthExceededError(
+                response.usage.completion_tokens if response.usage else max_tokens
+            )
 
         return OpenAIQueryResponse(response=response, message=message)
 
     async def _query_legacy(
-        self, user_input, messages, exposed_entities, n_requests, model, max_tokens,
-        top_p, temperature, context_threshold, functions
+        self, user_input, conversation_id, messages, exposed_entities, n_requests,
+        model, max_tokens, top_p, temperature, context_threshold, tool_registry
     ) -> OpenAIQueryResponse:
         """Handle legacy API calls using chat.completions.create()."""
         use_tools = self.entry.options.get(CONF_USE_TOOLS, DEFAULT_USE_TOOLS)
@@ -518,47 +778,62 @@ class OpenAIAgent(conversation.AbstractConversationAgent):
         ):
             function_call = "none"
 
-        tool_kwargs = {"functions": functions, "function_call": function_call}
+        tool_kwargs = {"functions": tool_registry.specs, "function_call": function_call}
         if use_tools:
             tool_kwargs = {
-                "tools": [{"type": "function", "function": func} for func in functions],
+                "tools": tool_registry.tools,
                 "tool_choice": function_call,
             }
 
-        if len(functions) == 0:
+        if len(tool_registry.specs) == 0:
             tool_kwargs = {}
 
         # Legacy models use max_tokens
         token_param = {"max_tokens": max_tokens}
 
-        response: ChatCompletion = await self.client.chat.completions.create(
+        response: ChatCompletion = await self._async_create_completion(
+            user_input,
             model=model,
             messages=messages,
             top_p=top_p,
             temperature=temperature,
-            user=user_input.conversation_id,
+            user=conversation_id,
             **token_param,
             **tool_kwargs,
         )
 
         _LOGGER.info("Legacy Response: %s", json.dumps(response.model_dump(exclude_none=True)))
 
-        if response.usage.total_tokens > context_threshold:
-            await self.truncate_message_history(messages, exposed_entities, user_input)
+        if response.usage and response.usage.total_tokens > context_threshold:
+            await self.truncate_message_history(
+                messages, exposed_entities, user_input, conversation_id
+            )
 
         choice: Choice = response.choices[0]
         message = choice.message
 
         if choice.finish_reason == "function_call":
             return await self.execute_function_call(
-                user_input, messages, message, exposed_entities, n_requests + 1
+                user_input,
+                conversation_id,
+                messages,
+                message,
+                exposed_entities,
+                n_requests + 1,
             )
         if choice.finish_reason == "tool_calls":
             return await self.execute_tool_calls(
-                user_input, messages, message, exposed_entities, n_requests + 1
+                user_input,
+                conversation_id,
+                messages,
+                message,
+                exposed_entities,
+                n_requests + 1,
             )
         if choice.finish_reason == "length":
-            raise TokenLengthExceededError(response.usage.completion_tokens)
+            raise TokenLengthExceededError(
+                response.usage.completion_tokens if response.usage else max_tokens
+            )
 
         return OpenAIQueryResponse(response=response, message=message)
 
@@ -566,19 +841,18 @@ class OpenAIAgent(conversation.AbstractConversationAgent):
     async def execute_function_call(
         self,
         user_input: conversation.ConversationInput,
+        conversation_id: str,
         messages,
         message: ChatCompletionMessage,
         exposed_entities,
         n_requests,
     ) -> OpenAIQueryResponse:
         function_name = message.function_call.name
-        function = next(
-            (s for s in self.get_functions() if s["spec"]["name"] == function_name),
-            None,
-        )
+        function = self.get_tool_registry().by_name.get(function_name)
         if function is not None:
             return await self.execute_function(
                 user_input,
+                conversation_id,
                 messages,
                 message,
                 exposed_entities,
@@ -590,6 +864,7 @@ class OpenAIAgent(conversation.AbstractConversationAgent):
     async def execute_function(
         self,
         user_input: conversation.ConversationInput,
+        conversation_id: str,
         messages,
         message: ChatCompletionMessage,
         exposed_entities,
@@ -611,45 +886,78 @@ class OpenAIAgent(conversation.AbstractConversationAgent):
             {
                 "role": "function",
                 "name": message.function_call.name,
-                "content": str(result),
+                "content": self._encode_tool_result(result),
             }
         )
-        return await self.query(user_input, messages, exposed_entities, n_requests)
+        return await self.query(
+            user_input, conversation_id, messages, exposed_entities, n_requests
+        )
 
     async def execute_tool_calls(
         self,
         user_input: conversation.ConversationInput,
+        conversation_id: str,
         messages,
         message: ChatCompletionMessage,
         exposed_entities,
         n_requests,
     ) -> OpenAIQueryResponse:
         messages.append(message.model_dump(exclude_none=True))
+        tool_registry = self.get_tool_registry()
+        functions = []
         for tool in message.tool_calls:
             function_name = tool.function.name
-            function = next(
-                (s for s in self.get_functions() if s["spec"]["name"] == function_name),
-                None,
+            function = tool_registry.by_name.get(function_name)
+            if function is None:
+                raise FunctionNotFound(function_name)
+            functions.append(function)
+
+        # Tool calls of one response are independent, so run them concurrently
+        semaphore = asyncio.Semaphore(
+            max(
+                1,
+                self.entry.options.get(
+                    CONF_MAX_PARALLEL_TOOL_CALLS, DEFAULT_MAX_PARALLEL_TOOL_CALLS
+                ),
             )
-            if function is not None:
-                result = await self.execute_tool_function(
+        )
+
+        async def execute_limited(tool, function):
+            async with semaphore:
+                return await self.execute_tool_function(
                     user_input,
                     tool,
                     exposed_entities,
                     function,
                 )
 
-                messages.append(
-                    {
-                        "tool_call_id": tool.id,
-                        "role": "tool",
-                        "name": function_name,
-                        "content": str(result),
-                    }
-                )
-            else:
-                raise FunctionNotFound(function_name)
-        return await self.query(user_input, messages, exposed_entities, n_requests)
+        results = await asyncio.gather(
+            *(
+                execute_limited(tool, function)
+                for tool, function in zip(message.tool_calls, functions)
+            )
+        )
+
+        for tool, result in zip(message.tool_calls, results):
+            messages.append(
+                {
+                    "tool_call_id": tool.id,
+                    "role": "tool",
+                    "name": tool.function.name,
+                    "content": self._encode_tool_result(result),
+                }
+            )
+        return await self.query(
+            user_input, conversation_id, messages, exposed_entities, n_requests
+        )
+
+    def _encode_tool_result(self, result) -> str:
+        return encode_tool_result(
+            result,
+            self.entry.options.get(
+                CONF_TOOL_RESULT_MAX_BYTES, DEFAULT_TOOL_RESULT_MAX_BYTES
+            ),
+        )
 
     async def execute_tool_function(
         self,
@@ -680,3 +988,36 @@ class OpenAIQueryResponse:
         """Initialize OpenAI query response value object."""
         self.response = response
         self.message = message
+
+
+class ToolRegistry:
+    """Enabled tools with validated executors and the serialized tools payload."""
+
+    def __init__(self, key: tuple) -> None:
+        """Compile the tools enabled by the given toggle values."""
+        self.key = key
+        self.functions = []
+        for (tool_conf, tool_data), enabled in zip(TOOLS.items(), key):
+            if not enabled:
+                continue
+            try:
+                function_executor = get_function_executor(tool_data["executor"]["type"])
+                processed_executor = function_executor.to_arguments(
+                    dict(tool_data["executor"])
+                )
+            except (InvalidFunction, FunctionNotFound) as e:
+                _LOGGER.warning("Failed to load function %s: %s", tool_data["schema"]["name"], e)
+                continue
+            except Exception as e:
+                _LOGGER.warning("Unexpected error loading function %s: %s", tool_data["schema"]["name"], e)
+                continue
+
+            self.functions.append({"spec": tool_data["schema"], "function": processed_executor})
+
+        self.by_name = {function["spec"]["name"]: function for function in self.functions}
+        self.specs = [function["spec"] for function in self.functions]
+        self.tools = [{"type": "function", "function": spec} for spec in self.specs]
+        self.token_count = count_tools_tokens(self.tools)
+        self.token_counts = {
+            tool["function"]["name"]: count_tools_tokens([tool]) for tool in self.tools
+        }
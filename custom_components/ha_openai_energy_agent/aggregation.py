@@ -0,0 +1,166 @@
+"""Local aggregation of long-term statistics for compact tool results."""
+
+from __future__ import annotations
+
+import math
+from typing import Any
+
+import homeassistant.util.dt as dt_util
+
+# Points kept in a downsampled series
+MAX_SERIES_POINTS = 24
+PERCENTILES = (50, 90)
+# How consecutive rows are merged when downsampling, by statistic type
+MERGE = {
+    "change": sum,
+    "mean": lambda values: sum(values) / len(values),
+    "min": min,
+    "max": max,
+    "sum": lambda values: values[-1],
+    "state": lambda values: values[-1],
+}
+
+
+def aggregate_statistics(
+    stats: dict[str, list[dict[str, Any]]],
+    types: set[str],
+    include_series: bool,
+    max_points: int = MAX_SERIES_POINTS,
+) -> dict[str, dict[str, Any]]:
+    """Return totals, means, peaks and percentiles per statistic.
+
+    With include_series, rows are also merged into at most max_points buckets.
+    """
+    result = {}
+    for statistic_id, rows in stats.items():
+        if not rows:
+            continue
+        summary: dict[str, Any] = {
+            "from": _as_local(rows[0]["start"]),
+            "to": _as_local(rows[-1]["end"]),
+            "periods": len(rows),
+        }
+        columns = {
+            statistic_type: [
+                (row["start"], row[statistic_type])
+                for row in rows
+                if row.get(statistic_type) is not None
+            ]
+            for statistic_type in types
+            if statistic_type in MERGE
+        }
+        for statistic_type, points in columns.items():
+            if points:
+                summary[statistic_type] = _describe(statistic_type, points)
+        if include_series:
+            summary["series"] = _downsample(rows, columns, max_points)
+        result[statistic_id] = summary
+    return result
+
+
+def summarize_energy(totals: dict[str, float]) -> dict[str, Any]:
+    """Return consumption, self-consumption, export, battery and cost of a period.
+
+    totals holds the change of each logical energy source over the period, energy
+    in kWh. Figures of sources that are not configured are left out.
+    """
+    grid_import = totals.get("grid import", 0.0)
+    grid_export = totals.get("grid export", 0.0)
+    solar = totals.get("solar production", 0.0)
+    charge = totals.get("battery charge", 0.0)
+    discharge = totals.get("battery discharge", 0.0)
+    # The energy dashboard balance, energy stored in the battery is not consumed
+    consumption = grid_import + solar + discharge - grid_export - charge
+    summary: dict[str, Any] = {
+        "consumption": consumption,
+        "grid_import": grid_import,
+        "grid_export": grid_export,
+    }
+    if "solar production" in totals:
+        self_consumption = max(solar - grid_export, 0.0)
+        summary["solar_production"] = solar
+        summary["self_consumption"] = self_consumption
+        summary["self_consumption_rate"] = _percentage(self_consumption, solar)
+    if "battery charge" in totals or "battery discharge" in totals:
+        summary["battery_charge"] = charge
+        summary["battery_discharge"] = discharge
+        summary["battery_net"] = discharge - charge
+    summary["self_sufficiency"] = _percentage(
+        max(consumption - grid_import, 0.0), consumption
+    )
+    if "grid import cost" in totals or "grid export compensation" in totals:
+        import_cost = totals.get("grid import cost", 0.0)
+        compensation = totals.get("grid export compensation", 0.0)
+        summary["grid_import_cost"] = import_cost
+        summary["grid_export_compensation"] = compensation
+        summary["cost"] = import_cost - compensation
+    for name in ("gas consumption", "gas cost", "device consumption"):
+        if name in totals:
+            summary[name.replace(" ", "_")] = totals[name]
+    return {
+        key: _round(value) if isinstance(value, float) else value
+        for key, value in summary.items()
+        if value is not None
+    }
+
+
+def _describe(statistic_type: str, points: list[tuple[float, float]]) -> dict:
+    values = sorted(value for _, value in points)
+    peak_start, peak = max(points, key=lambda point: point[1])
+    low_start, low = min(points, key=lambda point: point[1])
+    description = {
+        "mean": _round(sum(values) / len(values)),
+        "min": _round(low),
+        "min_at": _as_local(low_start),
+        "max": _round(peak),
+        "max_at": _as_local(peak_start),
+    }
+    if statistic_type == "change":
+        description["total"] = _round(sum(values))
+    elif statistic_type in ("sum", "state"):
+        description["first"] = _round(points[0][1])
+        description["last"] = _round(points[-1][1])
+    for percentile in PERCENTILES:
+        # Nearest-rank percentile
+        rank = max(1, math.ceil(percentile / 100 * len(values)))
+        description[f"p{percentile}"] = _round(values[rank - 1])
+    return description
+
+
+def _downsample(
+    rows: list[dict[str, Any]],
+    columns: dict[str, list[tuple[float, float]]],
+    max_points: int,
+) -> list[dict[str, Any]]:
+    size = math.ceil(len(rows) / max_points)
+    series = []
+    for index in range(0, len(rows), size):
+        chunk = rows[index : index + size]
+        start, end = chunk[0]["start"], chunk[-1]["end"]
+        point: dict[str, Any] = {"start": _as_local(start)}
+        for statistic_type in columns:
+            values = [
+                row[statistic_type]
+                for row in chunk
+                if row.get(statistic_type) is not None
+            ]
+            if values:
+                point[statistic_type] = _round(MERGE[statistic_type](values))
+        if size > 1:
+            point["end"] = _as_local(end)
+        series.append(point)
+    return series
+
+
+def _as_local(timestamp: float) -> str:
+    return dt_util.as_local(dt_util.utc_from_timestamp(timestamp)).isoformat()
+
+
+def _round(value: float) -> float:
+    return round(value, 3)
+
+
+def _percentage(part: float, total: float) -> float | None:
+    if total <= 0:
+        return None
+    return round(100 * part / total, 1)
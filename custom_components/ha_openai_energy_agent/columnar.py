@@ -0,0 +1,102 @@
+"""Columnar encoding of time series tool results."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import State
+import homeassistant.util.dt as dt_util
+
+
+def run_length_encode(values: list[Any]) -> list[Any] | dict[str, list]:
+    """Return {"runs": [[value, count], ...]} when that is shorter, else values."""
+    runs: list[list[Any]] = []
+    for value in values:
+        if runs and runs[-1][0] == value:
+            runs[-1][1] += 1
+        else:
+            runs.append([value, 1])
+    if len(runs) * 2 <= len(values):
+        return {"runs": runs}
+    return values
+
+
+def encode_timestamps(timestamps: list[float]) -> dict[str, Any]:
+    """Return the first timestamp and the seconds between consecutive ones."""
+    deltas = [
+        round(timestamp - previous)
+        for previous, timestamp in zip(timestamps, timestamps[1:])
+    ]
+    start = dt_util.as_local(dt_util.utc_from_timestamp(timestamps[0]))
+    return {"start": start.isoformat(), "deltas": run_length_encode(deltas)}
+
+
+def encode_series(
+    timestamps: list[float], columns: dict[str, list[Any]]
+) -> dict[str, Any]:
+    """Return a series as delta encoded timestamps and run length encoded columns."""
+    if not timestamps:
+        return {}
+    return {
+        "time": encode_timestamps(timestamps),
+        **{name: run_length_encode(values) for name, values in columns.items()},
+    }
+
+
+def encode_history(history: dict[str, list[State | dict[str, Any]]]) -> dict:
+    """Return significant states per entity in columnar form."""
+    result = {}
+    for entity_id, states in history.items():
+        timestamps = []
+        values = []
+        attributes = None
+        for state in states:
+            if isinstance(state, State):
+                timestamps.append(state.last_changed.timestamp())
+                values.append(state.state)
+                attributes = state.attributes or attributes
+            else:
+                timestamps.append(_as_timestamp(state["last_changed"]))
+                values.append(state["state"])
+                attributes = state.get("attributes") or attributes
+        series = encode_series(timestamps, {"state": values})
+        if attributes:
+            # Attributes are usually static, only the latest ones are kept
+            series["attributes"] = dict(attributes)
+        result[entity_id] = series
+    return result
+
+
+def encode_statistics(stats: dict[str, list[dict[str, Any]]], types: set[str]):
+    """Return statistics rows per statistic in columnar form."""
+    return {
+        statistic_id: encode_series(
+            [row["start"] for row in rows],
+            {
+                statistic_type: [row.get(statistic_type) for row in rows]
+                for statistic_type in sorted(types)
+                if any(row.get(statistic_type) is not None for row in rows)
+            },
+        )
+        for statistic_id, rows in stats.items()
+    }
+
+
+def encode_rows(names: list[str], rows: list[tuple]) -> dict[str, Any]:
+    """Return query rows as run length encoded columns."""
+    return {
+        "rows": len(rows),
+        "columns": {
+            name: run_length_encode([row[index] for row in rows])
+            for index, name in enumerate(names)
+        },
+    }
+
+
+def _as_timestamp(value: datetime | str | float) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = dt_util.parse_datetime(value)
+    return value.timestamp()
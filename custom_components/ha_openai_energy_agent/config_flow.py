@@ -34,11 +34,14 @@ from .const import (
     CONF_CONTEXT_TRUNCATE_STRATEGY,
     CONF_FUNCTIONS,
     CONF_MAX_FUNCTION_CALLS_PER_CONVERSATION,
+    CONF_MAX_PARALLEL_TOOL_CALLS,
     CONF_MAX_TOKENS,
     CONF_ORGANIZATION,
     CONF_PROMPT,
+    CONF_PROMPT_ENTITY_LIMIT,
     CONF_SKIP_AUTHENTICATION,
     CONF_TEMPERATURE,
+    CONF_TOOL_RESULT_MAX_BYTES,
     CONF_TOP_P,
     CONF_USE_TOOLS,
     CONF_USE_EXECUTE_SERVICES_TOOL,
@@ -50,7 +53,14 @@ from .const import (
     CONF_USE_GET_ATTRIBUTES_TOOL,
     CONF_USE_GET_AUTOMATION_TOOL,
     CONF_USE_ADJUST_AUTOMATION_TOOL,
+    CONF_USE_STATE_HISTORY_TOOL,
+    CONF_USE_ENERGY_SUMMARY_TOOL,
     CONF_ENABLE_CONTINUOUS_CONVERSATION,
+    CONF_HISTORY_MAX_BYTES,
+    CONF_HISTORY_MAX_CONVERSATIONS,
+    CONF_HISTORY_TTL,
+    CONF_PERSIST_HISTORY,
+    CONF_STREAM_RESPONSE,
     CONTEXT_TRUNCATE_STRATEGIES,
     DEFAULT_ATTACH_USERNAME,
     DEFAULT_CHAT_MODEL,
@@ -59,11 +69,14 @@ from .const import (
     DEFAULT_CONTEXT_THRESHOLD,
     DEFAULT_CONTEXT_TRUNCATE_STRATEGY,
     DEFAULT_MAX_FUNCTION_CALLS_PER_CONVERSATION,
+    DEFAULT_MAX_PARALLEL_TOOL_CALLS,
     DEFAULT_MAX_TOKENS,
     DEFAULT_NAME,
     DEFAULT_PROMPT,
+    DEFAULT_PROMPT_ENTITY_LIMIT,
     DEFAULT_SKIP_AUTHENTICATION,
     DEFAULT_TEMPERATURE,
+    DEFAULT_TOOL_RESULT_MAX_BYTES,
     DEFAULT_TOP_P,
     DEFAULT_USE_TOOLS,
     DEFAULT_USE_EXECUTE_SERVICES_TOOL,
@@ -75,7 +88,14 @@ from .const import (
     DEFAULT_USE_GET_ATTRIBUTES_TOOL,
     DEFAULT_USE_GET_AUTOMATION_TOOL,
     DEFAULT_USE_ADJUST_AUTOMATION_TOOL,
+    DEFAULT_USE_STATE_HISTORY_TOOL,
+    DEFAULT_USE_ENERGY_SUMMARY_TOOL,
     DEFAULT_ENABLE_CONTINUOUS_CONVERSATION,
+    DEFAULT_HISTORY_MAX_BYTES,
+    DEFAULT_HISTORY_MAX_CONVERSATIONS,
+    DEFAULT_HISTORY_TTL,
+    DEFAULT_PERSIST_HISTORY,
+    DEFAULT_STREAM_RESPONSE,
     DOMAIN,
 )
 from .helpers import validate_authentication
@@ -100,9 +120,12 @@ DEFAULT_CONF_FUNCTIONS_STR = yaml.dump(DEFAULT_CONF_FUNCTIONS, sort_keys=False)
 DEFAULT_OPTIONS = types.MappingProxyType(
     {
         CONF_PROMPT: DEFAULT_PROMPT,
+        CONF_PROMPT_ENTITY_LIMIT: DEFAULT_PROMPT_ENTITY_LIMIT,
         CONF_CHAT_MODEL: DEFAULT_CHAT_MODEL,
         CONF_MAX_TOKENS: DEFAULT_MAX_TOKENS,
         CONF_MAX_FUNCTION_CALLS_PER_CONVERSATION: DEFAULT_MAX_FUNCTION_CALLS_PER_CONVERSATION,
+        CONF_MAX_PARALLEL_TOOL_CALLS: DEFAULT_MAX_PARALLEL_TOOL_CALLS,
+        CONF_TOOL_RESULT_MAX_BYTES: DEFAULT_TOOL_RESULT_MAX_BYTES,
         CONF_TOP_P: DEFAULT_TOP_P,
         CONF_TEMPERATURE: DEFAULT_TEMPERATURE,
         CONF_FUNCTIONS: DEFAULT_CONF_FUNCTIONS_STR,
@@ -120,7 +143,14 @@ DEFAULT_OPTIONS = types.MappingProxyType(
         CONF_USE_GET_ATTRIBUTES_TOOL: DEFAULT_USE_GET_ATTRIBUTES_TOOL,
         CONF_USE_GET_AUTOMATION_TOOL: DEFAULT_USE_GET_AUTOMATION_TOOL,
         CONF_USE_ADJUST_AUTOMATION_TOOL: DEFAULT_USE_ADJUST_AUTOMATION_TOOL,
+        CONF_USE_STATE_HISTORY_TOOL: DEFAULT_USE_STATE_HISTORY_TOOL,
+        CONF_USE_ENERGY_SUMMARY_TOOL: DEFAULT_USE_ENERGY_SUMMARY_TOOL,
         CONF_ENABLE_CONTINUOUS_CONVERSATION: DEFAULT_ENABLE_CONTINUOUS_CONVERSATION,
+        CONF_HISTORY_MAX_CONVERSATIONS: DEFAULT_HISTORY_MAX_CONVERSATIONS,
+        CONF_HISTORY_MAX_BYTES: DEFAULT_HISTORY_MAX_BYTES,
+        CONF_HISTORY_TTL: DEFAULT_HISTORY_TTL,
+        CONF_PERSIST_HISTORY: DEFAULT_PERSIST_HISTORY,
+        CONF_STREAM_RESPONSE: DEFAULT_STREAM_RESPONSE,
     }
 )
 
@@ -225,6 +255,15 @@ class OptionsFlow(config_entries.OptionsFlow):
                 description={"suggested_value": options[CONF_PROMPT]},
                 default=DEFAULT_PROMPT,
             ): TemplateSelector(),
+            vol.Optional(
+                CONF_PROMPT_ENTITY_LIMIT,
+                description={
+                    "suggested_value": options.get(
+                        CONF_PROMPT_ENTITY_LIMIT, DEFAULT_PROMPT_ENTITY_LIMIT
+                    )
+                },
+                default=DEFAULT_PROMPT_ENTITY_LIMIT,
+            ): int,
             vol.Optional(
                 CONF_CHAT_MODEL,
                 description={
@@ -255,6 +294,24 @@ class OptionsFlow(config_entries.OptionsFlow):
                 },
                 default=DEFAULT_MAX_FUNCTION_CALLS_PER_CONVERSATION,
             ): int,
+            vol.Optional(
+                CONF_MAX_PARALLEL_TOOL_CALLS,
+                description={
+                    "suggested_value": options.get(
+                        CONF_MAX_PARALLEL_TOOL_CALLS, DEFAULT_MAX_PARALLEL_TOOL_CALLS
+                    )
+                },
+                default=DEFAULT_MAX_PARALLEL_TOOL_CALLS,
+            ): int,
+            vol.Optional(
+                CONF_TOOL_RESULT_MAX_BYTES,
+                description={
+                    "suggested_value": options.get(
+                        CONF_TOOL_RESULT_MAX_BYTES, DEFAULT_TOOL_RESULT_MAX_BYTES
+                    )
+                },
+                default=DEFAULT_TOOL_RESULT_MAX_BYTES,
+            ): int,
             # Individual Energy Management Tools
             vol.Optional(
                 CONF_USE_EXECUTE_SERVICES_TOOL,
@@ -301,11 +358,46 @@ class OptionsFlow(config_entries.OptionsFlow):
                 description={"suggested_value": options.get(CONF_USE_ADJUST_AUTOMATION_TOOL, DEFAULT_USE_ADJUST_AUTOMATION_TOOL)},
                 default=DEFAULT_USE_ADJUST_AUTOMATION_TOOL,
             ): BooleanSelector(),
+            vol.Optional(
+                CONF_USE_STATE_HISTORY_TOOL,
+                description={"suggested_value": options.get(CONF_USE_STATE_HISTORY_TOOL, DEFAULT_USE_STATE_HISTORY_TOOL)},
+                default=DEFAULT_USE_STATE_HISTORY_TOOL,
+            ): BooleanSelector(),
+            vol.Optional(
+                CONF_USE_ENERGY_SUMMARY_TOOL,
+                description={"suggested_value": options.get(CONF_USE_ENERGY_SUMMARY_TOOL, DEFAULT_USE_ENERGY_SUMMARY_TOOL)},
+                default=DEFAULT_USE_ENERGY_SUMMARY_TOOL,
+            ): BooleanSelector(),
             vol.Optional(
                 CONF_ENABLE_CONTINUOUS_CONVERSATION,
                 description={"suggested_value": options.get(CONF_ENABLE_CONTINUOUS_CONVERSATION, DEFAULT_ENABLE_CONTINUOUS_CONVERSATION)},
                 default=DEFAULT_ENABLE_CONTINUOUS_CONVERSATION,
             ): BooleanSelector(),
+            vol.Optional(
+                CONF_HISTORY_MAX_CONVERSATIONS,
+                description={"suggested_value": options.get(CONF_HISTORY_MAX_CONVERSATIONS, DEFAULT_HISTORY_MAX_CONVERSATIONS)},
+                default=DEFAULT_HISTORY_MAX_CONVERSATIONS,
+            ): int,
+            vol.Optional(
+                CONF_HISTORY_MAX_BYTES,
+                description={"suggested_value": options.get(CONF_HISTORY_MAX_BYTES, DEFAULT_HISTORY_MAX_BYTES)},
+                default=DEFAULT_HISTORY_MAX_BYTES,
+            ): int,
+            vol.Optional(
+                CONF_HISTORY_TTL,
+                description={"suggested_value": options.get(CONF_HISTORY_TTL, DEFAULT_HISTORY_TTL)},
+                default=DEFAULT_HISTORY_TTL,
+            ): int,
+            vol.Optional(
+                CONF_PERSIST_HISTORY,
+                description={"suggested_value": options.get(CONF_PERSIST_HISTORY, DEFAULT_PERSIST_HISTORY)},
+                default=DEFAULT_PERSIST_HISTORY,
+            ): BooleanSelector(),
+            vol.Optional(
+                CONF_STREAM_RESPONSE,
+                description={"suggested_value": options.get(CONF_STREAM_RESPONSE, DEFAULT_STREAM_RESPONSE)},
+                default=DEFAULT_STREAM_RESPONSE,
+            ): BooleanSelector(),
             vol.Optional(
                 CONF_ATTACH_USERNAME,
                 description={"suggested_value": options.get(CONF_ATTACH_USERNAME)},
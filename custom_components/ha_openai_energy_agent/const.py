@@ -9,9 +9,15 @@ CONF_API_VERSION = "api_version"
 CONF_SKIP_AUTHENTICATION = "skip_authentication"
 DEFAULT_SKIP_AUTHENTICATION = False
 
+# hass.data key for agent.
+DATA_AGENT = "agent"
+
 EVENT_AUTOMATION_REGISTERED = "automation_registered_via_ha_openai_energy_agent"
 EVENT_CONVERSATION_FINISHED = "ha_openai_energy_agent.conversation.finished"
 
+# Dispatcher signal with the prompt token breakdown, formatted with the entry id
+SIGNAL_PROMPT_TOKENS = "ha_openai_energy_agent_prompt_tokens_{}"
+
 CONF_PROMPT = "prompt"
 DEFAULT_PROMPT = """I want you to act as an intelligent Energy Management Agent for Home Assistant.
 
@@ -30,7 +36,7 @@ entity_id,name,state,aliases
 {% endfor -%}
 ```
 
-When user ask about energy related question: Total Energy Consumption = Grid Energy + Solar Energy Generation. The sum of grid energy plus the sum of solar energy generation. When you calculate the energy consumption, you need to take solar production into account.
+When user ask about energy related question: Total Energy Consumption = Grid Energy + Solar Energy Generation. The sum of grid energy plus the sum of solar energy generation. When you calculate the energy consumption, you need to take solar production into account. Use energy_summary when it is available, it does this calculation for you.
 
 Energy Management Priorities:
 1. Monitor real-time energy consumption and costs
@@ -51,6 +57,13 @@ Always consider energy efficiency in my recommendations.
 Provide clear, actionable advice in everyday language.
 Directly conduct function calls to activate tools, no need to ask users for confirmation.
 """
+# Seconds for which a rendered prompt (and the now() inside it) is reused
+PROMPT_CACHE_TIME_BUCKET = 60
+# Recent system prompts whose rendered entities are kept for the token breakdown
+PROMPT_ENTITIES_CACHE_SIZE = 8
+# Exposed entities most relevant to the request included in the prompt, 0 includes all
+CONF_PROMPT_ENTITY_LIMIT = "prompt_entity_limit"
+DEFAULT_PROMPT_ENTITY_LIMIT = 0
 CONF_CHAT_MODEL = "chat_model"
 DEFAULT_CHAT_MODEL = "gpt-5"
 CONF_MAX_TOKENS = "max_tokens"
@@ -61,6 +74,8 @@ CONF_TEMPERATURE = "temperature"
 DEFAULT_TEMPERATURE = 1
 CONF_MAX_FUNCTION_CALLS_PER_CONVERSATION = "max_function_calls_per_conversation"
 DEFAULT_MAX_FUNCTION_CALLS_PER_CONVERSATION = 10
+CONF_MAX_PARALLEL_TOOL_CALLS = "max_parallel_tool_calls"
+DEFAULT_MAX_PARALLEL_TOOL_CALLS = 4
 # Individual Tool Configuration Constants
 CONF_USE_EXECUTE_SERVICES_TOOL = "use_execute_services_tool"
 CONF_USE_GET_ENERGY_DATA_TOOL = "use_get_energy_data_tool"
@@ -71,6 +86,8 @@ CONF_USE_GET_EVENTS_TOOL = "use_get_events_tool"
 CONF_USE_GET_ATTRIBUTES_TOOL = "use_get_attributes_tool"
 CONF_USE_GET_AUTOMATION_TOOL = "use_get_automation_tool"
 CONF_USE_ADJUST_AUTOMATION_TOOL = "use_adjust_automation_tool"
+CONF_USE_STATE_HISTORY_TOOL = "use_state_history_tool"
+CONF_USE_ENERGY_SUMMARY_TOOL = "use_energy_summary_tool"
 
 # Default tool enablement - All tools enabled by default
 DEFAULT_USE_EXECUTE_SERVICES_TOOL = True
@@ -82,10 +99,26 @@ DEFAULT_USE_GET_EVENTS_TOOL = True
 DEFAULT_USE_GET_ATTRIBUTES_TOOL = True
 DEFAULT_USE_GET_AUTOMATION_TOOL = True
 DEFAULT_USE_ADJUST_AUTOMATION_TOOL = True
+# Reads the SQLite recorder database directly, so it is opt-in
+DEFAULT_USE_STATE_HISTORY_TOOL = False
+DEFAULT_USE_ENERGY_SUMMARY_TOOL = True
 
 # Continuous Conversation Configuration
 CONF_ENABLE_CONTINUOUS_CONVERSATION = "enable_continuous_conversation"
 DEFAULT_ENABLE_CONTINUOUS_CONVERSATION = True
+CONF_HISTORY_MAX_CONVERSATIONS = "history_max_conversations"
+DEFAULT_HISTORY_MAX_CONVERSATIONS = 50
+CONF_HISTORY_MAX_BYTES = "history_max_bytes"
+DEFAULT_HISTORY_MAX_BYTES = 5_000_000
+# Minutes of inactivity after which a conversation is forgotten
+CONF_HISTORY_TTL = "history_ttl"
+DEFAULT_HISTORY_TTL = 1440
+CONF_PERSIST_HISTORY = "persist_history"
+DEFAULT_PERSIST_HISTORY = False
+
+# Streaming Response Configuration
+CONF_STREAM_RESPONSE = "stream_response"
+DEFAULT_STREAM_RESPONSE = False
 
 # GPT-5 Compatible Function Definitions with strict schema
 GPT5_FUNCTION_SCHEMAS = {
@@ -134,7 +167,7 @@ GPT5_FUNCTION_SCHEMAS = {
     "get_energy_statistic_ids": {
         "type": "function",
         "name": "get_energy_statistic_ids",
-        "description": "Get energy statistic IDs for analysis and monitoring",
+        "description": "Get the statistic IDs of each energy source (grid import, grid export, solar production, battery charge and discharge, gas, water, device consumption and their costs)",
         "parameters": {
             "type": "object",
             "properties": {},
@@ -143,6 +176,27 @@ GPT5_FUNCTION_SCHEMAS = {
         },
         "strict": True
     },
+    "energy_summary": {
+        "type": "function",
+        "name": "energy_summary",
+        "description": "Get the energy consumption, self-consumption, grid import and export, battery charge and discharge, and cost of a period in one call. Prefer this over get_statistics for totals. Statistics are compiled every 5 minutes, so the last few minutes before end_time may be missing",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "start_time": {
+                    "type": ["string", "null"],
+                    "description": "The start datetime, defaults to the start of today"
+                },
+                "end_time": {
+                    "type": ["string", "null"],
+                    "description": "The end datetime, defaults to now"
+                }
+            },
+            "required": ["start_time", "end_time"],
+            "additionalProperties": False
+        },
+        "strict": True
+    },
     "get_statistics": {
         "type": "function",
         "name": "get_statistics",
@@ -162,16 +216,21 @@ GPT5_FUNCTION_SCHEMAS = {
                     "type": "array",
                     "items": {
                         "type": "string",
-                        "description": "The statistic IDs"
+                        "description": "A statistic ID or an energy source name such as 'grid import', 'grid export', 'solar production', 'battery charge', 'battery discharge', 'gas consumption' or 'device consumption'"
                     }
                 },
                 "period": {
                     "type": "string",
                     "description": "The period",
                     "enum": ["day", "week", "month"]
+                },
+                "format": {
+                    "type": "string",
+                    "description": "summary returns totals, means, peaks and percentiles per statistic, series adds a downsampled series, columnar returns every row as delta encoded timestamps and run length encoded columns, raw returns every row. Prefer summary",
+                    "enum": ["summary", "series", "columnar", "raw"]
                 }
             },
-            "required": ["start_time", "end_time", "statistic_ids", "period"],
+            "required": ["start_time", "end_time", "statistic_ids", "period", "format"],
             "additionalProperties": False
         },
         "strict": True
@@ -297,6 +356,44 @@ GPT5_FUNCTION_SCHEMAS = {
             "additionalProperties": False
         },
         "strict": False
+    },
+    "get_state_history": {
+        "type": "function",
+        "name": "get_state_history",
+        "description": "Answer state history questions from the recorder: the state of an entity at a time, how long it was in a state between two times, or when it last changed (to a state)",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "state_at_time uses time, on_duration uses state, start_time and end_time, last_changed optionally uses state",
+                    "enum": ["state_at_time", "on_duration", "last_changed"]
+                },
+                "entity_id": {
+                    "type": "string",
+                    "description": "The entity to look up"
+                },
+                "state": {
+                    "type": ["string", "null"],
+                    "description": "The state to measure or look for, on_duration defaults to 'on'"
+                },
+                "time": {
+                    "type": ["string", "null"],
+                    "description": "The datetime for state_at_time, defaults to now"
+                },
+                "start_time": {
+                    "type": ["string", "null"],
+                    "description": "The start datetime for on_duration, defaults to 24 hours ago"
+                },
+                "end_time": {
+                    "type": ["string", "null"],
+                    "description": "The end datetime for on_duration, defaults to now"
+                }
+            },
+            "required": ["query", "entity_id", "state", "time", "start_time", "end_time"],
+            "additionalProperties": False
+        },
+        "strict": True
     }
 }
 
@@ -309,10 +406,29 @@ CONF_USE_TOOLS = "use_tools"
 DEFAULT_USE_TOOLS = False
 CONF_CONTEXT_THRESHOLD = "context_threshold"
 DEFAULT_CONTEXT_THRESHOLD = 13000
-CONTEXT_TRUNCATE_STRATEGIES = [{"key": "clear", "label": "Clear All Messages"}]
+CONTEXT_TRUNCATE_STRATEGIES = [
+    {"key": "clear", "label": "Clear All Messages"},
+    {"key": "sliding_window", "label": "Drop Oldest Messages Within Token Budget"},
+    {"key": "drop_tool_results", "label": "Drop Oldest Tool Results First"},
+    {"key": "summarize", "label": "Summarize Older Messages"},
+]
 CONF_CONTEXT_TRUNCATE_STRATEGY = "context_truncate_strategy"
 DEFAULT_CONTEXT_TRUNCATE_STRATEGY = CONTEXT_TRUNCATE_STRATEGIES[0]["key"]
+TOOL_RESULT_OMITTED = "[result omitted to save context]"
+# Bytes of a serialized tool result sent to the model, 0 sends everything
+CONF_TOOL_RESULT_MAX_BYTES = "tool_result_max_bytes"
+DEFAULT_TOOL_RESULT_MAX_BYTES = 16000
+TOOL_RESULT_TRUNCATED = "... [truncated {} bytes]"
+CONTEXT_SUMMARY_PROMPT = (
+    "Summarize the following conversation between a user and a Home Assistant "
+    "energy management assistant in a few short sentences. Keep entity ids, "
+    "numbers, units, dates and any decisions or pending requests."
+)
+CONTEXT_SUMMARY_HEADER = "Summary of the earlier conversation:\n"
+# Characters of each older message that are sent to be summarized
+CONTEXT_SUMMARY_MESSAGE_CHARS = 2000
 
 SERVICE_QUERY_IMAGE = "query_image"
+SERVICE_QUERY_IMAGES = "query_images"
 
 CONF_PAYLOAD_TEMPLATE = "payload_template"
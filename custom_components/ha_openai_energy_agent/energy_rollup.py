@@ -0,0 +1,280 @@
+"""Local rollup store of hourly, daily and monthly energy totals."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+import logging
+import sqlite3
+from threading import Lock
+import time
+from typing import Any
+
+from homeassistant.components import recorder
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_track_utc_time_change
+from homeassistant.helpers.start import async_at_started
+from homeassistant.helpers.storage import STORAGE_DIR
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN
+from .energy_sources import EnergySourceMap
+from .statistics_cache import SETTLE_TIME, period_end, period_start
+
+_LOGGER = logging.getLogger(__name__)
+
+ROLLUP_PERIODS = ("hour", "day", "month")
+# Hourly rows are kept this long, daily and monthly rows are kept forever
+HOUR_RETENTION = timedelta(days=400)
+# Minute past every hour the store is updated, after the recorder has compiled
+# the statistics of the previous hour
+UPDATE_MINUTE = 15
+# Stored buckets this recent are fetched again on every update, so late compiles,
+# imports and adjustments of the recorder statistics are picked up
+REFRESH_WINDOW = {
+    "hour": timedelta(hours=48),
+    "day": timedelta(days=2),
+    "month": timedelta(days=1),
+}
+# Once a day a longer window is fetched again for older adjustments
+DEEP_REFRESH_WINDOW = {
+    "hour": timedelta(days=31),
+    "day": timedelta(days=31),
+    "month": timedelta(days=366),
+}
+DEEP_REFRESH_INTERVAL = 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup (
+  statistic_id TEXT NOT NULL,
+  period TEXT NOT NULL,
+  start REAL NOT NULL,
+  "end" REAL NOT NULL,
+  change REAL NOT NULL,
+  PRIMARY KEY (statistic_id, period, start)
+) WITHOUT ROWID
+"""
+SELECT_LAST_STARTS = """
+SELECT statistic_id, MAX(start) FROM rollup WHERE period = ? GROUP BY statistic_id
+"""
+SELECT_ROWS = """
+SELECT statistic_id, start, "end", change FROM rollup
+WHERE period = ? AND start >= ? AND start < ?
+ORDER BY statistic_id, start
+"""
+DELETE_FROM = """
+DELETE FROM rollup WHERE statistic_id = ? AND period = ? AND start >= ?
+"""
+UPSERT_ROW = """
+INSERT OR REPLACE INTO rollup (statistic_id, period, start, "end", change)
+VALUES (?, ?, ?, ?, ?)
+"""
+
+
+class EnergyRollup:
+    """Keep energy source changes by hour, day and month in a SQLite file.
+
+    The store is filled from recorder statistics once and then only the buckets
+    of the last two days are fetched every hour, and those of the last month once
+    a day. Ranges of completed buckets are answered from the store without
+    touching the recorder database.
+    """
+
+    def __init__(self, hass: HomeAssistant, sources: EnergySourceMap) -> None:
+        """Initialize the store, the file is opened on the first update."""
+        self.hass = hass
+        self.sources = sources
+        self.path = hass.config.path(STORAGE_DIR, f"{DOMAIN}.energy_rollup.db")
+        self._connection: sqlite3.Connection | None = None
+        self._lock = Lock()
+        self._update_lock = asyncio.Lock()
+        self._statistic_ids: set[str] = set()
+        # period -> buckets starting before this timestamp are complete
+        self._synced_until: dict[str, float] = {}
+        # Monotonic time of the last update that fetched the deep window
+        self._deep_refreshed_at: float | None = None
+
+    async def async_setup(self) -> None:
+        """Update the store once started and then every hour."""
+
+        async def async_update(*_: Any) -> None:
+            await self.async_update()
+
+        @callback
+        def close(event: Event) -> None:
+            self.hass.async_add_executor_job(self.close)
+
+        async_at_started(self.hass, async_update)
+        async_track_utc_time_change(
+            self.hass, async_update, minute=UPDATE_MINUTE, second=0
+        )
+        self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, close)
+
+    async def async_update(self) -> None:
+        """Fetch the statistics recorded since the last update."""
+        async with self._update_lock:
+            statistic_ids = await self.sources.async_statistic_ids()
+            if not statistic_ids and self._connection is None:
+                return
+            now = dt_util.utcnow()
+            settled = (now - SETTLE_TIME).timestamp()
+            deep = (
+                self._deep_refreshed_at is None
+                or time.monotonic() - self._deep_refreshed_at > DEEP_REFRESH_INTERVAL
+            )
+            windows = DEEP_REFRESH_WINDOW if deep else REFRESH_WINDOW
+            try:
+                for period in ROLLUP_PERIODS:
+                    await self._async_update_period(
+                        period, statistic_ids, now, windows[period]
+                    )
+                    self._synced_until[period] = period_start(settled, period)
+            except (HomeAssistantError, sqlite3.Error) as err:
+                _LOGGER.warning("Unable to update the energy rollup store: %s", err)
+                return
+            if deep:
+                self._deep_refreshed_at = time.monotonic()
+            self._statistic_ids = statistic_ids
+
+    async def async_statistics(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        statistic_ids: list[str],
+        period: str,
+    ) -> dict[str, list[dict[str, Any]]] | None:
+        """Return the change of each bucket of a range of completed buckets.
+
+        Returns None when the store cannot answer the request, the rows have the
+        shape of statistics_during_period otherwise.
+        """
+        start = start_time.timestamp()
+        end = end_time.timestamp()
+        if (
+            period not in self._synced_until
+            or end > self._synced_until[period]
+            or not self._statistic_ids.issuperset(statistic_ids)
+            # Partial buckets at either end are only in the recorder statistics
+            or period_start(start, period) != start
+            or period_start(end, period) != end
+            or (
+                period == "hour"
+                and start < (dt_util.utcnow() - HOUR_RETENTION).timestamp()
+            )
+        ):
+            return None
+        rows = await self.hass.async_add_executor_job(
+            self._select, period, start, end
+        )
+        wanted = set(statistic_ids)
+        result: dict[str, list[dict[str, Any]]] = {}
+        for statistic_id, row_start, row_end, change in rows:
+            if statistic_id in wanted:
+                result.setdefault(statistic_id, []).append(
+                    {"start": row_start, "end": row_end, "change": change}
+                )
+        return result
+
+    def close(self) -> None:
+        """Close the database file."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    async def _async_update_period(
+        self,
+        period: str,
+        statistic_ids: set[str],
+        now: datetime,
+        refresh_window: timedelta,
+    ) -> None:
+        last_starts = dict(
+            await self.hass.async_add_executor_job(
+                self._execute, SELECT_LAST_STARTS, (period,)
+            )
+        )
+        backfill = 0.0
+        if period == "hour":
+            backfill = period_start((now - HOUR_RETENTION).timestamp(), period)
+        refresh_from = period_start((now - refresh_window).timestamp(), period)
+        # The last stored bucket may have been partial, it is fetched again along
+        # with the recent buckets the recorder may still have changed
+        by_start: dict[float, set[str]] = {}
+        for statistic_id in statistic_ids:
+            start = backfill
+            if statistic_id in last_starts:
+                start = max(min(last_starts[statistic_id], refresh_from), backfill)
+            by_start.setdefault(start, set()).add(statistic_id)
+
+        rows = []
+        for start, ids in by_start.items():
+            stats = await recorder.get_instance(self.hass).async_add_executor_job(
+                recorder.statistics.statistics_during_period,
+                self.hass,
+                dt_util.utc_from_timestamp(start),
+                now,
+                ids,
+                period,
+                None,
+                {"change"},
+            )
+            rows.extend(
+                (
+                    statistic_id,
+                    period,
+                    row["start"],
+                    row.get("end") or period_end(row["start"], period),
+                    row["change"],
+                )
+                for statistic_id, statistic_rows in stats.items()
+                for row in statistic_rows
+                if row.get("change") is not None
+            )
+        await self.hass.async_add_executor_job(
+            self._store, period, rows, statistic_ids, backfill, by_start
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(SCHEMA)
+        return self._connection
+
+    def _execute(self, query: str, params: tuple) -> list[tuple]:
+        with self._lock:
+            return self._connect().execute(query, params).fetchall()
+
+    def _select(self, period: str, start: float, end: float) -> list[tuple]:
+        return self._execute(SELECT_ROWS, (period, start, end))
+
+    def _store(
+        self,
+        period: str,
+        rows: list[tuple],
+        statistic_ids: set[str],
+        keep_after: float,
+        fetched_from: dict[float, set[str]],
+    ) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                # Buckets the recorder no longer returns are removed as well
+                connection.executemany(
+                    DELETE_FROM,
+                    (
+                        (statistic_id, period, start)
+                        for start, ids in fetched_from.items()
+                        for statistic_id in ids
+                    ),
+                )
+                connection.executemany(UPSERT_ROW, rows)
+                # Sources removed from the energy preferences are forgotten
+                placeholders = ",".join("?" * len(statistic_ids))
+                connection.execute(
+                    "DELETE FROM rollup WHERE period = ? AND (start < ?"
+                    f" OR statistic_id NOT IN ({placeholders}))",
+                    (period, keep_after, *statistic_ids),
+                )
@@ -0,0 +1,144 @@
+"""Map of logical energy sources to the statistic ids configured for them."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components import energy
+from homeassistant.core import HomeAssistant
+
+# Logical name -> (source type, key of the statistic id in the source or flow)
+SOURCE_STATISTICS = {
+    "grid import": ("flow_from", "stat_energy_from"),
+    "grid import cost": ("flow_from", "stat_cost"),
+    "grid export": ("flow_to", "stat_energy_to"),
+    "grid export compensation": ("flow_to", "stat_compensation"),
+    "solar production": ("solar", "stat_energy_from"),
+    "battery charge": ("battery", "stat_energy_to"),
+    "battery discharge": ("battery", "stat_energy_from"),
+    "gas consumption": ("gas", "stat_energy_from"),
+    "gas cost": ("gas", "stat_cost"),
+    "water consumption": ("water", "stat_energy_from"),
+    "water cost": ("water", "stat_cost"),
+}
+# Statistic keys of the compensation and cost statistics the energy integration
+# compiles itself when a price is configured instead of a cost statistic
+COMPILED_COST_KEYS = {
+    "stat_cost": "stat_energy_from",
+    "stat_compensation": "stat_energy_to",
+}
+# Sources the energy summary is computed from
+ENERGY_SUMMARY_SOURCES = (
+    "grid import",
+    "grid export",
+    "solar production",
+    "battery charge",
+    "battery discharge",
+    "grid import cost",
+    "grid export compensation",
+    "gas consumption",
+    "gas cost",
+    "device consumption",
+)
+ALIASES = {
+    "import": "grid import",
+    "export": "grid export",
+    "solar": "solar production",
+    "gas": "gas consumption",
+    "water": "water consumption",
+    "devices": "device consumption",
+}
+
+
+def normalize_name(name: str) -> str:
+    """Return a logical name in lower case with single spaces."""
+    return " ".join(name.lower().replace("_", " ").replace("-", " ").split())
+
+
+def build_source_map(
+    prefs: dict[str, Any] | None, cost_sensors: dict[str, str]
+) -> dict[str, list[str]]:
+    """Return the statistic ids of each logical source in the energy preferences.
+
+    cost_sensors maps energy statistic ids to the cost sensors the energy
+    integration created for them.
+    """
+    if not prefs:
+        return {}
+    flows: dict[str, list[dict[str, Any]]] = {}
+    for source in prefs.get("energy_sources", []):
+        if source["type"] == "grid":
+            flows.setdefault("flow_from", []).extend(source.get("flow_from", []))
+            flows.setdefault("flow_to", []).extend(source.get("flow_to", []))
+        else:
+            flows.setdefault(source["type"], []).append(source)
+
+    source_map: dict[str, list[str]] = {}
+    for name, (flow_type, key) in SOURCE_STATISTICS.items():
+        statistic_ids = []
+        for flow in flows.get(flow_type, []):
+            statistic_id = flow.get(key)
+            if statistic_id is None and key in COMPILED_COST_KEYS:
+                statistic_id = cost_sensors.get(flow.get(COMPILED_COST_KEYS[key]))
+            if statistic_id is not None and statistic_id not in statistic_ids:
+                statistic_ids.append(statistic_id)
+        if statistic_ids:
+            source_map[name] = statistic_ids
+    if devices := [
+        device["stat_consumption"] for device in prefs.get("device_consumption", [])
+    ]:
+        source_map["device consumption"] = devices
+    return source_map
+
+
+class EnergySourceMap:
+    """Cache the map of logical energy sources until the energy preferences change."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the map, it is built on first use."""
+        self.hass = hass
+        self._map: dict[str, list[str]] | None = None
+
+    async def async_setup(self) -> None:
+        """Drop the map whenever the energy preferences are updated."""
+
+        async def async_invalidate() -> None:
+            self._map = None
+
+        energy_manager = await energy.async_get_manager(self.hass)
+        energy_manager.async_listen_updates(async_invalidate)
+
+    async def async_get(self) -> dict[str, list[str]]:
+        """Return logical source names and their statistic ids."""
+        if self._map is not None:
+            return self._map
+        energy_manager = await energy.async_get_manager(self.hass)
+        cost_sensors = self.hass.data.get(energy.DOMAIN, {}).get("cost_sensors", {})
+        source_map = build_source_map(energy_manager.data, cost_sensors)
+        # Cost sensors are only created while Home Assistant starts
+        if self.hass.is_running:
+            self._map = source_map
+        return source_map
+
+    async def async_statistic_ids(self) -> set[str]:
+        """Return every statistic id in the map."""
+        return {
+            statistic_id
+            for statistic_ids in (await self.async_get()).values()
+            for statistic_id in statistic_ids
+        }
+
+    async def async_resolve(self, names: list[str]) -> list[str]:
+        """Replace logical source names by their statistic ids.
+
+        Names that are not logical sources are taken as statistic ids.
+        """
+        source_map = await self.async_get()
+        statistic_ids: list[str] = []
+        for name in names:
+            normalized = normalize_name(name)
+            normalized = ALIASES.get(normalized, normalized)
+            for statistic_id in source_map.get(normalized, [name]):
+                if statistic_id not in statistic_ids:
+                    statistic_ids.append(statistic_id)
+        return statistic_ids
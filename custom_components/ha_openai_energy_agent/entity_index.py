@@ -0,0 +1,281 @@
+"""Exposed entity index for the OpenAI Energy Management Agent."""
+
+from __future__ import annotations
+
+from collections import Counter
+from functools import cached_property
+import math
+import re
+
+from homeassistant.components import conversation
+from homeassistant.components.homeassistant.exposed_entities import (
+    async_listen_entity_updates,
+    async_should_expose,
+)
+from homeassistant.const import ATTR_DEVICE_CLASS, EVENT_STATE_CHANGED
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
+from homeassistant.helpers import (
+    area_registry as ar,
+    device_registry as dr,
+    entity_registry as er,
+)
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+SQL_STRING_LITERAL = re.compile(r"'([^']*)'")
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase terms, also splitting entity ids on '.' and '_'."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class ExposedEntities(list):
+    """Snapshot of the exposed entities for a single turn."""
+
+    def __init__(self, entities=(), version=0) -> None:
+        """Initialize the snapshot."""
+        super().__init__(entities)
+        self.version = version
+
+    @cached_property
+    def entity_ids(self) -> frozenset[str]:
+        """Return the ids of the exposed entities, built once per snapshot."""
+        return frozenset(entity["entity_id"] for entity in self)
+
+
+def exposed_entity_ids(exposed_entities) -> frozenset[str]:
+    """Return the ids of exposed entities given as a snapshot or a plain list."""
+    if isinstance(exposed_entities, ExposedEntities):
+        return exposed_entities.entity_ids
+    return frozenset(entity["entity_id"] for entity in exposed_entities)
+
+
+class ExposedEntityIndex:
+    """Keep the exposed entities current from state, registry and expose events."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the index."""
+        self.hass = hass
+        self._entities: dict[str, dict] = {}
+        self._version = 0
+        self._snapshot: ExposedEntities | None = None
+        self._unsubscribers: list[CALLBACK_TYPE] = []
+        # Lexical index over name, aliases, entity_id, domain, area and device class
+        self._documents: dict[str, Counter[str]] = {}
+        self._postings: dict[str, set[str]] = {}
+        self._total_terms = 0
+
+    @property
+    def version(self) -> int:
+        """Return a counter that changes whenever the exposed entities change."""
+        return self._version
+
+    @callback
+    def async_start(self) -> None:
+        """Build the index and subscribe to the events that keep it current."""
+        self._async_rebuild()
+        self._unsubscribers = [
+            self.hass.bus.async_listen(
+                EVENT_STATE_CHANGED, self._async_handle_state_changed
+            ),
+            self.hass.bus.async_listen(
+                er.EVENT_ENTITY_REGISTRY_UPDATED, self._async_handle_registry_updated
+            ),
+            self.hass.bus.async_listen(
+                dr.EVENT_DEVICE_REGISTRY_UPDATED, self._async_reindex_documents
+            ),
+            self.hass.bus.async_listen(
+                ar.EVENT_AREA_REGISTRY_UPDATED, self._async_reindex_documents
+            ),
+            async_listen_entity_updates(
+                self.hass, conversation.DOMAIN, self._async_rebuild
+            ),
+        ]
+
+    @callback
+    def async_stop(self) -> None:
+        """Unsubscribe from all events."""
+        while self._unsubscribers:
+            self._unsubscribers.pop()()
+
+    @callback
+    def async_get_snapshot(self) -> ExposedEntities:
+        """Return the exposed entities, reusing the snapshot until something changes."""
+        if self._snapshot is None:
+            self._snapshot = ExposedEntities(self._entities.values(), self._version)
+        return self._snapshot
+
+    @callback
+    def async_rank(self, text: str, limit: int) -> ExposedEntities:
+        """Return the exposed entities most relevant to a text, ranked with BM25.
+
+        The whole snapshot is returned when no entity matches any term.
+        """
+        snapshot = self.async_get_snapshot()
+        terms = set(tokenize(text))
+        scores: dict[str, float] = {}
+        if self._documents:
+            document_count = len(self._documents)
+            average_length = self._total_terms / document_count
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(
+                    1 + (document_count - len(postings) + 0.5) / (len(postings) + 0.5)
+                )
+                for entity_id in postings:
+                    document = self._documents[entity_id]
+                    frequency = document[term]
+                    length = sum(document.values())
+                    scores[entity_id] = scores.get(entity_id, 0.0) + idf * (
+                        frequency
+                        * (BM25_K1 + 1)
+                        / (
+                            frequency
+                            + BM25_K1
+                            * (1 - BM25_B + BM25_B * length / average_length)
+                        )
+                    )
+
+        if not scores:
+            return snapshot
+
+        ranked = sorted(scores, key=lambda entity_id: -scores[entity_id])[:limit]
+        return ExposedEntities(
+            (self._entities[entity_id] for entity_id in ranked),
+            (snapshot.version, tuple(ranked)),
+        )
+
+    @callback
+    def _async_rebuild(self) -> None:
+        """Rebuild the whole index, used on start and when expose settings change."""
+        entity_registry = er.async_get(self.hass)
+        entities = {}
+        for state in self.hass.states.async_all():
+            if async_should_expose(self.hass, conversation.DOMAIN, state.entity_id):
+                entities[state.entity_id] = self._as_entry(
+                    state, entity_registry.async_get(state.entity_id)
+                )
+        if entities != self._entities:
+            self._entities = entities
+            self._async_changed()
+        self._async_reindex_documents()
+
+    @callback
+    def _async_handle_state_changed(self, event: Event) -> None:
+        entity_id = event.data["entity_id"]
+        new_state: State | None = event.data["new_state"]
+        if new_state is None:
+            self._async_discard(entity_id)
+        elif entity_id in self._entities:
+            self._async_update(new_state)
+        elif event.data["old_state"] is None and async_should_expose(
+            self.hass, conversation.DOMAIN, entity_id
+        ):
+            self._async_update(new_state)
+
+    @callback
+    def _async_handle_registry_updated(self, event: Event) -> None:
+        entity_id = event.data["entity_id"]
+        if old_entity_id := event.data.get("old_entity_id"):
+            self._async_discard(old_entity_id)
+        if event.data["action"] == "remove":
+            self._async_discard(entity_id)
+            return
+
+        state = self.hass.states.get(entity_id)
+        if state is not None and async_should_expose(
+            self.hass, conversation.DOMAIN, entity_id
+        ):
+            self._async_update(state, reindex=True)
+        else:
+            self._async_discard(entity_id)
+
+    @callback
+    def _async_update(self, state: State, reindex: bool = False) -> None:
+        entity = er.async_get(self.hass).async_get(state.entity_id)
+        entry = self._as_entry(state, entity)
+        previous = self._entities.get(state.entity_id)
+        if previous != entry:
+            self._entities[state.entity_id] = entry
+            self._async_changed()
+        if reindex or previous is None or previous["name"] != entry["name"]:
+            self._async_index_document(state, entity)
+
+    @callback
+    def _async_discard(self, entity_id: str) -> None:
+        if self._entities.pop(entity_id, None) is not None:
+            self._async_remove_document(entity_id)
+            self._async_changed()
+
+    @callback
+    def _async_changed(self) -> None:
+        self._version += 1
+        self._snapshot = None
+
+    @callback
+    def _async_reindex_documents(self, event: Event | None = None) -> None:
+        """Rebuild the lexical index, area and device changes can affect any entity."""
+        self._documents = {}
+        self._postings = {}
+        self._total_terms = 0
+        entity_registry = er.async_get(self.hass)
+        for entity_id in self._entities:
+            if (state := self.hass.states.get(entity_id)) is not None:
+                self._async_index_document(state, entity_registry.async_get(entity_id))
+
+    @callback
+    def _async_index_document(
+        self, state: State, entity: er.RegistryEntry | None
+    ) -> None:
+        entity_id = state.entity_id
+        fields = [entity_id, state.name]
+        if device_class := state.attributes.get(ATTR_DEVICE_CLASS):
+            fields.append(str(device_class))
+        if entity is not None:
+            fields.extend(entity.aliases)
+            area_id = entity.area_id
+            if area_id is None and entity.device_id is not None:
+                device = dr.async_get(self.hass).async_get(entity.device_id)
+                area_id = device.area_id if device else None
+            if area_id is not None and (
+                area := ar.async_get(self.hass).async_get_area(area_id)
+            ):
+                fields.append(area.name)
+
+        self._async_remove_document(entity_id)
+        document = Counter(tokenize(" ".join(fields)))
+        self._documents[entity_id] = document
+        self._total_terms += sum(document.values())
+        for term in document:
+            self._postings.setdefault(term, set()).add(entity_id)
+
+    @callback
+    def _async_remove_document(self, entity_id: str) -> None:
+        document = self._documents.pop(entity_id, None)
+        if document is None:
+            return
+        self._total_terms -= sum(document.values())
+        for term in document:
+            postings = self._postings[term]
+            postings.discard(entity_id)
+            if not postings:
+                del self._postings[term]
+
+    @staticmethod
+    def _as_entry(state: State, entity: er.RegistryEntry | None) -> dict:
+        aliases = []
+        if entity and entity.aliases:
+            aliases = entity.aliases
+
+        return {
+            "entity_id": state.entity_id,
+            "name": state.name,
+            "state": state.state,
+            "aliases": aliases,
+        }
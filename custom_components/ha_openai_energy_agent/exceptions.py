@@ -133,3 +133,16 @@ class InvalidFunction(HomeAssistantError):
     def __str__(self) -> str:
         """Return string representation."""
         return f"failed to validate function `{self.function_name}` ({self.__cause__})"
+
+
+class SqliteQueryTimeout(HomeAssistantError):
+    """When a sqlite function query runs longer than its timeout."""
+
+    def __init__(self, timeout: float) -> None:
+        """Initialize error."""
+        super().__init__(self, f"query interrupted after {timeout} seconds")
+        self.timeout = timeout
+
+    def __str__(self) -> str:
+        """Return string representation."""
+        return f"query interrupted after {self.timeout} seconds, narrow it down"
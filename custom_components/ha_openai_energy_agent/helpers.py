@@ -1,23 +1,26 @@
 from abc import ABC, abstractmethod
-from datetime import timedelta
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
 from functools import partial
+import json
 import logging
 import os
 import re
-import sqlite3
 import time
 from typing import Any
 from urllib import parse
 
 from bs4 import BeautifulSoup
 from openai import AsyncAzureOpenAI, AsyncOpenAI
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+import orjson
 import voluptuous as vol
 import yaml
 
 from homeassistant.components import (
     automation,
     conversation,
-    energy,
     recorder,
     rest,
     scrape,
@@ -35,17 +38,32 @@ from homeassistant.const import (
     CONF_TIMEOUT,
     CONF_VALUE_TEMPLATE,
     CONF_VERIFY_SSL,
+    EVENT_STATE_CHANGED,
     SERVICE_RELOAD,
+    UnitOfEnergy,
+    UnitOfVolume,
 )
-from homeassistant.core import HomeAssistant, State
+from homeassistant.core import Event, HomeAssistant, State, callback
 from homeassistant.exceptions import HomeAssistantError, ServiceNotFound
 from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.httpx_client import get_async_client
+from homeassistant.helpers.json import json_encoder_default
 from homeassistant.helpers.script import Script
 from homeassistant.helpers.template import Template
 import homeassistant.util.dt as dt_util
-
-from .const import CONF_PAYLOAD_TEMPLATE, DOMAIN, EVENT_AUTOMATION_REGISTERED
+from homeassistant.util.unit_conversion import EnergyConverter, VolumeConverter
+
+from .aggregation import aggregate_statistics, summarize_energy
+from .columnar import encode_history, encode_rows, encode_statistics
+from .const import (
+    CONF_PAYLOAD_TEMPLATE,
+    DOMAIN,
+    EVENT_AUTOMATION_REGISTERED,
+    TOOL_RESULT_TRUNCATED,
+)
+from .energy_rollup import EnergyRollup
+from .energy_sources import ENERGY_SUMMARY_SOURCES, EnergySourceMap
+from .entity_index import SQL_STRING_LITERAL, exposed_entity_ids
 from .exceptions import (
     CallServiceError,
     EntityNotExposed,
@@ -54,12 +72,66 @@ from .exceptions import (
     InvalidFunction,
     NativeNotFound,
 )
+from .recorder_queries import (
+    async_last_changed,
+    async_state_at_time,
+    async_state_duration,
+)
+from .sqlite_pool import SqlitePool
+from .statistics_cache import StatisticsCache, period_end, period_start
 
 _LOGGER = logging.getLogger(__name__)
 
 
 AZURE_DOMAIN_PATTERN = r"\.(openai\.azure\.com|azure-api\.net)"
 
+# Seconds for which results of read-only native functions are reused, they are
+# also invalidated as soon as the automations change
+CACHED_FUNCTION_TTL = {
+    "get_automation": 30,
+}
+
+
+def summary_segments(
+    start_time: datetime, end_time: datetime
+) -> list[tuple[datetime, datetime, str]]:
+    """Split a range into statistics periods that cover it.
+
+    Whole months or days are used when both ends are aligned to them. Otherwise
+    whole hours are used, with 5-minute statistics for partial hours at either
+    end, such as the current hour.
+    """
+    start = start_time.timestamp()
+    end = end_time.timestamp()
+    for period in ("month", "day"):
+        if period_start(start, period) == start and period_start(end, period) == end:
+            return [(start_time, end_time, period)]
+    first_hour = period_start(start, "hour")
+    if first_hour < start:
+        first_hour = period_end(first_hour, "hour")
+    last_hour = period_start(end, "hour")
+    if first_hour >= last_hour:
+        return [(start_time, end_time, "5minute")]
+    segments = []
+    if start < first_hour:
+        segments.append((start_time, dt_util.utc_from_timestamp(first_hour), "5minute"))
+    segments.append(
+        (
+            dt_util.utc_from_timestamp(first_hour),
+            dt_util.utc_from_timestamp(last_hour),
+            "hour",
+        )
+    )
+    if last_hour < end:
+        segments.append((dt_util.utc_from_timestamp(last_hour), end_time, "5minute"))
+    return segments
+
+
+def _targets_overlap(first: set[str] | None, second: set[str] | None) -> bool:
+    if first is None or second is None:
+        return True
+    return not first.isdisjoint(second)
+
 
 def get_function_executor(value: str):
     function_executor = FUNCTION_EXECUTORS.get(value)
@@ -126,34 +198,179 @@ def _get_rest_data(hass, rest_config, arguments):
     return rest.create_rest_data_from_config(hass, rest_config)
 
 
-async def validate_authentication(
+def create_client(
     hass: HomeAssistant,
     api_key: str,
     base_url: str,
     api_version: str,
     organization: str = None,
-    skip_authentication=False,
-) -> None:
-    if skip_authentication:
-        return
-
+) -> AsyncOpenAI:
+    """Create an OpenAI or Azure client on Home Assistant's shared connection pool."""
     if is_azure(base_url):
-        client = AsyncAzureOpenAI(
+        return AsyncAzureOpenAI(
             api_key=api_key,
             azure_endpoint=base_url,
             api_version=api_version,
             organization=organization,
             http_client=get_async_client(hass),
         )
+    return AsyncOpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        organization=organization,
+        http_client=get_async_client(hass),
+    )
+
+
+async def validate_authentication(
+    hass: HomeAssistant,
+    api_key: str,
+    base_url: str,
+    api_version: str,
+    organization: str = None,
+    skip_authentication=False,
+) -> None:
+    if skip_authentication:
+        return
+
+    client = create_client(hass, api_key, base_url, api_version, organization)
+    await hass.async_add_executor_job(partial(client.models.list, timeout=10))
+
+
+def compact_tool_result(value: Any) -> Any:
+    """Return a tool result without nulls, empty containers and state contexts."""
+    if isinstance(value, State):
+        # as_dict returns a read-only dict that is shared with other callers
+        value = value.as_dict()
+    if isinstance(value, dict):
+        state_shaped = "entity_id" in value and "state" in value
+        compacted = {}
+        for key, item in value.items():
+            if state_shaped and key == "context":
+                continue
+            item = compact_tool_result(item)
+            if item is not None and item != {} and item != []:
+                compacted[key] = item
+        return compacted
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [compact_tool_result(item) for item in value]
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # BLOB columns, such as the binary context ids of the recorder
+        return bytes(value).hex()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return value
+
+
+def _tool_result_default(value: Any) -> Any:
+    """Encode Home Assistant objects, and anything else as its string."""
+    try:
+        return json_encoder_default(value)
+    except TypeError:
+        return str(value)
+
+
+def encode_tool_result(result: Any, max_bytes: int) -> str:
+    """Serialize a tool result as compact JSON, capped at max_bytes if set."""
+    if isinstance(result, str):
+        encoded = result.encode("utf-8")
     else:
-        client = AsyncOpenAI(
-            api_key=api_key,
-            base_url=base_url,
-            organization=organization,
-            http_client=get_async_client(hass),
+        encoded = orjson.dumps(
+            compact_tool_result(result),
+            option=orjson.OPT_NON_STR_KEYS,
+            default=_tool_result_default,
         )
+    if not max_bytes or len(encoded) <= max_bytes:
+        return encoded.decode("utf-8")
+    # A multi-byte character cut at the limit is dropped rather than mangled
+    truncated = encoded[:max_bytes].decode("utf-8", "ignore")
+    return truncated + TOOL_RESULT_TRUNCATED.format(len(encoded) - max_bytes)
 
-    await hass.async_add_executor_job(partial(client.models.list, timeout=10))
+
+class StreamedCompletion:
+    """Assemble a ChatCompletion from streamed chunks."""
+
+    def __init__(self) -> None:
+        """Initialize the accumulator."""
+        self.id = ""
+        self.model = ""
+        self.created = 0
+        self.content: list[str] = []
+        self.finish_reason = None
+        self.function_call: dict[str, str] | None = None
+        self.tool_calls: dict[int, dict[str, Any]] = {}
+        self.usage = None
+
+    def add_chunk(self, chunk: ChatCompletionChunk) -> str | None:
+        """Merge a chunk and return the text delta it carried, if any."""
+        self.id = chunk.id or self.id
+        self.model = chunk.model or self.model
+        self.created = chunk.created or self.created
+        if chunk.usage is not None:
+            self.usage = chunk.usage.model_dump()
+        if not chunk.choices:
+            return None
+
+        choice = chunk.choices[0]
+        if choice.finish_reason is not None:
+            self.finish_reason = choice.finish_reason
+        delta = choice.delta
+
+        if delta.function_call is not None:
+            if self.function_call is None:
+                self.function_call = {"name": "", "arguments": ""}
+            self.function_call["name"] += delta.function_call.name or ""
+            self.function_call["arguments"] += delta.function_call.arguments or ""
+
+        for tool_call in delta.tool_calls or []:
+            assembled = self.tool_calls.setdefault(
+                tool_call.index,
+                {"id": "", "type": "function", "function": {"name": "", "arguments": ""}},
+            )
+            if tool_call.id:
+                assembled["id"] = tool_call.id
+            if tool_call.function is not None:
+                assembled["function"]["name"] += tool_call.function.name or ""
+                assembled["function"]["arguments"] += (
+                    tool_call.function.arguments or ""
+                )
+
+        if delta.content:
+            self.content.append(delta.content)
+            return delta.content
+        return None
+
+    def as_completion(self) -> ChatCompletion:
+        """Return the assembled response."""
+        message: dict[str, Any] = {
+            "role": "assistant",
+            "content": "".join(self.content) if self.content else None,
+        }
+        if self.function_call is not None:
+            message["function_call"] = self.function_call
+        if self.tool_calls:
+            message["tool_calls"] = [
+                self.tool_calls[index] for index in sorted(self.tool_calls)
+            ]
+
+        return ChatCompletion.model_validate(
+            {
+                "id": self.id,
+                "object": "chat.completion",
+                "created": self.created,
+                "model": self.model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": self.finish_reason or "stop",
+                        "message": message,
+                    }
+                ],
+                "usage": self.usage,
+            }
+        )
 
 
 class FunctionExecutor(ABC):
@@ -175,8 +392,7 @@ class FunctionExecutor(ABC):
     def validate_entity_ids(self, hass: HomeAssistant, entity_ids, exposed_entities):
         if any(hass.states.get(entity_id) is None for entity_id in entity_ids):
             raise EntityNotFound(entity_ids)
-        exposed_entity_ids = map(lambda e: e["entity_id"], exposed_entities)
-        if not set(entity_ids).issubset(exposed_entity_ids):
+        if not exposed_entity_ids(exposed_entities).issuperset(entity_ids):
             raise EntityNotExposed(entity_ids)
 
     @abstractmethod
@@ -195,6 +411,39 @@ class NativeFunctionExecutor(FunctionExecutor):
     def __init__(self) -> None:
         """initialize native function"""
         super().__init__(vol.Schema({vol.Required("name"): str}))
+        # (name, arguments) -> (expiry on the monotonic clock, result)
+        self._cache: dict[tuple[str, str], tuple[float, Any]] = {}
+        self._statistics: StatisticsCache | None = None
+        self._sources: EnergySourceMap | None = None
+        self._rollup: EnergyRollup | None = None
+
+    async def async_setup(self, hass: HomeAssistant) -> None:
+        """Set up the statistics stores and invalidation of cached results."""
+        self._statistics = StatisticsCache(hass)
+        self._sources = EnergySourceMap(hass)
+        await self._sources.async_setup()
+        self._rollup = EnergyRollup(hass, self._sources)
+        await self._rollup.async_setup()
+
+        @callback
+        def invalidate_automations(event: Event) -> None:
+            self.async_invalidate("get_automation")
+
+        @callback
+        def automation_state_changed(event: Event) -> None:
+            if event.data["entity_id"].startswith(f"{automation.DOMAIN}."):
+                self.async_invalidate("get_automation")
+
+        hass.bus.async_listen(
+            automation.EVENT_AUTOMATION_RELOADED, invalidate_automations
+        )
+        hass.bus.async_listen(EVENT_STATE_CHANGED, automation_state_changed)
+
+    @callback
+    def async_invalidate(self, name: str) -> None:
+        """Drop the cached results of a function."""
+        for key in [key for key in self._cache if key[0] == name]:
+            del self._cache[key]
 
     async def execute(
         self,
@@ -203,6 +452,34 @@ class NativeFunctionExecutor(FunctionExecutor):
         arguments,
         user_input: conversation.ConversationInput,
         exposed_entities,
+    ):
+        name = function["name"]
+        if (ttl := CACHED_FUNCTION_TTL.get(name)) is None:
+            return await self._execute(
+                hass, function, arguments, user_input, exposed_entities
+            )
+
+        try:
+            key = (name, json.dumps(arguments, sort_keys=True, default=str))
+        except TypeError:
+            key = None
+        now = time.monotonic()
+        if key in self._cache and self._cache[key][0] > now:
+            return self._cache[key][1]
+        result = await self._execute(
+            hass, function, arguments, user_input, exposed_entities
+        )
+        if key is not None:
+            self._cache[key] = (now + ttl, result)
+        return result
+
+    async def _execute(
+        self,
+        hass: HomeAssistant,
+        function,
+        arguments,
+        user_input: conversation.ConversationInput,
+        exposed_entities,
     ):
         name = function["name"]
         if name == "execute_service":
@@ -214,6 +491,7 @@ class NativeFunctionExecutor(FunctionExecutor):
                 hass, function, arguments, user_input, exposed_entities
             )
         if name == "add_automation":
+            self.async_invalidate("get_automation")
             return await self.add_automation(
                 hass, function, arguments, user_input, exposed_entities
             )
@@ -229,6 +507,10 @@ class NativeFunctionExecutor(FunctionExecutor):
             return await self.get_statistics(
                 hass, function, arguments, user_input, exposed_entities
             )
+        if name == "energy_summary":
+            return await self.energy_summary(
+                hass, function, arguments, user_input, exposed_entities
+            )
         if name == "get_user_from_user_id":
             return await self.get_user_from_user_id(
                 hass, function, arguments, user_input, exposed_entities
@@ -238,9 +520,19 @@ class NativeFunctionExecutor(FunctionExecutor):
                 hass, function, arguments, user_input, exposed_entities
             )
         if name == "adjust_automation":
+            self.async_invalidate("get_automation")
             return await self.adjust_automation(
                 hass, function, arguments, user_input, exposed_entities
             )
+        if name == "get_state_history":
+            return await self.get_state_history(
+                hass, function, arguments, user_input, exposed_entities
+            )
+        if name in ("state_at_time", "on_duration", "last_changed"):
+            arguments = {**arguments, "query": name}
+            return await self.get_state_history(
+                hass, function, arguments, user_input, exposed_entities
+            )
         if name == "create_calendar_event":
             return await self.create_calendar_event(
                 hass, function, arguments, user_input, exposed_entities
@@ -260,6 +552,12 @@ class NativeFunctionExecutor(FunctionExecutor):
         user_input: conversation.ConversationInput,
         exposed_entities,
     ):
+        domain, service, service_data = self.prepare_service_call(
+            hass, service_argument, exposed_entities
+        )
+        return await self.call_service(hass, domain, service, service_data)
+
+    def prepare_service_call(self, hass: HomeAssistant, service_argument, exposed_entities):
         domain = service_argument["domain"]
         service = service_argument["service"]
         service_data = service_argument.get(
@@ -278,12 +576,16 @@ class NativeFunctionExecutor(FunctionExecutor):
         if not hass.services.has_service(domain, service):
             raise ServiceNotFound(domain, service)
         self.validate_entity_ids(hass, entity_id or [], exposed_entities)
+        return domain, service, service_data
 
+    async def call_service(self, hass: HomeAssistant, domain, service, service_data):
         try:
             await hass.services.async_call(
                 domain=domain,
                 service=service,
                 service_data=service_data,
+                # Wait for the call, calls on the same entities run in order
+                blocking=True,
             )
             return {"success": True}
         except HomeAssistantError as e:
@@ -298,14 +600,93 @@ class NativeFunctionExecutor(FunctionExecutor):
         user_input: conversation.ConversationInput,
         exposed_entities,
     ):
-        result = []
-        for service_argument in arguments.get("list", []):
-            result.append(
-                await self.execute_service_single(
-                    hass, function, service_argument, user_input, exposed_entities
+        # Validate the whole batch before anything is called
+        calls = [
+            self.prepare_service_call(hass, service_argument, exposed_entities)
+            for service_argument in arguments.get("list", [])
+        ]
+
+        # Calls that only differ by entity_id are merged into one service call and
+        # run concurrently, unless a call in between targets one of their entities
+        groups: list[tuple[str, str, dict]] = []
+        targets: list[set[str] | None] = []
+        dependencies: list[set[int]] = []
+        merge_into: dict[Any, int] = {}
+        item_groups = []
+        for domain, service, service_data in calls:
+            entity_ids = self.service_call_targets(service_data)
+            conflicts = {
+                index
+                for index, group_targets in enumerate(targets)
+                if _targets_overlap(entity_ids, group_targets)
+            }
+            key = self.service_call_key(domain, service, service_data)
+            index = merge_into.get(key) if key is not None else None
+            if index is not None and all(conflict <= index for conflict in conflicts):
+                merged_entity_ids = groups[index][2]["entity_id"]
+                merged_entity_ids.extend(
+                    entity_id
+                    for entity_id in service_data["entity_id"]
+                    if entity_id not in merged_entity_ids
+                )
+                targets[index] |= entity_ids
+                dependencies[index] |= conflicts - {index}
+            else:
+                if service_data["entity_id"]:
+                    service_data = {
+                        **service_data,
+                        "entity_id": list(service_data["entity_id"]),
+                    }
+                index = len(groups)
+                groups.append((domain, service, service_data))
+                targets.append(entity_ids)
+                dependencies.append(conflicts)
+                if key is not None:
+                    merge_into[key] = index
+            item_groups.append(index)
+
+        # Calls sharing an entity run one after another in the requested order
+        tasks: list[asyncio.Task] = []
+        for group, group_dependencies in zip(groups, dependencies):
+            tasks.append(
+                hass.async_create_task(
+                    self._call_service_after(
+                        hass, group, [tasks[index] for index in group_dependencies]
+                    )
                 )
             )
-        return result
+        results = await asyncio.gather(*tasks)
+        return [results[index] for index in item_groups]
+
+    async def _call_service_after(
+        self,
+        hass: HomeAssistant,
+        call: tuple[str, str, dict],
+        dependencies: list[asyncio.Task],
+    ):
+        if dependencies:
+            await asyncio.wait(dependencies)
+        return await self.call_service(hass, *call)
+
+    def service_call_targets(self, service_data: dict) -> set[str] | None:
+        """Return the entity ids a call targets, None when it may target any."""
+        if not service_data["entity_id"] or any(
+            service_data.get(key) is not None for key in ("area_id", "device_id")
+        ):
+            return None
+        return set(service_data["entity_id"])
+
+    def service_call_key(self, domain: str, service: str, service_data: dict):
+        """Return a key shared by calls that can be merged, None otherwise."""
+        if not service_data["entity_id"] or any(
+            service_data.get(key) is not None for key in ("area_id", "device_id")
+        ):
+            return None
+        rest = {key: value for key, value in service_data.items() if key != "entity_id"}
+        try:
+            return (domain, service, json.dumps(rest, sort_keys=True))
+        except TypeError:
+            return None
 
     async def add_automation(
         self,
@@ -650,6 +1031,8 @@ class NativeFunctionExecutor(FunctionExecutor):
                 no_attributes,
             )
 
+        if arguments.get("format") == "columnar":
+            return encode_history(result)
         return [[self.as_dict(item) for item in sublist] for sublist in result.values()]
 
     async def get_energy(
@@ -660,8 +1043,7 @@ class NativeFunctionExecutor(FunctionExecutor):
         user_input: conversation.ConversationInput,
         exposed_entities,
     ):
-        energy_manager: energy.data.EnergyManager = await energy.async_get_manager(hass)
-        return energy_manager.data
+        return await self._sources.async_get()
 
     async def get_user_from_user_id(
         self,
@@ -682,19 +1064,182 @@ class NativeFunctionExecutor(FunctionExecutor):
         user_input: conversation.ConversationInput,
         exposed_entities,
     ):
-        statistic_ids = arguments.get("statistic_ids", [])
+        statistic_ids = await self._sources.async_resolve(
+            arguments.get("statistic_ids", [])
+        )
         start_time = dt_util.as_utc(dt_util.parse_datetime(arguments["start_time"]))
         end_time = dt_util.as_utc(dt_util.parse_datetime(arguments["end_time"]))
 
-        return await recorder.get_instance(hass).async_add_executor_job(
-            recorder.statistics.statistics_during_period,
-            hass,
+        types = set(arguments.get("types", {"change"}))
+        stats = await self.async_statistics(
             start_time,
             end_time,
             statistic_ids,
             arguments.get("period", "day"),
             arguments.get("units"),
-            arguments.get("types", {"change"}),
+            types,
+        )
+        # Functions defined before the format argument existed get raw rows
+        statistic_format = arguments.get("format", "raw")
+        if statistic_format == "raw":
+            return stats
+        if statistic_format == "columnar":
+            return encode_statistics(stats, types)
+        return aggregate_statistics(stats, types, statistic_format == "series")
+
+    async def energy_summary(
+        self,
+        hass: HomeAssistant,
+        function,
+        arguments,
+        user_input: conversation.ConversationInput,
+        exposed_entities,
+    ):
+        """Compute consumption, self-consumption, export, battery and cost."""
+        end_time = self.as_utc(
+            arguments.get("end_time"), dt_util.utcnow(), "end_time not valid"
+        )
+        start_time = self.as_utc(
+            arguments.get("start_time"),
+            dt_util.as_utc(dt_util.start_of_local_day()),
+            "start_time not valid",
+        )
+        if start_time >= end_time:
+            raise HomeAssistantError("start_time must be before end_time")
+
+        source_map = await self._sources.async_get()
+        if not source_map:
+            return "No energy sources are configured in the energy dashboard"
+        names = [name for name in ENERGY_SUMMARY_SOURCES if name in source_map]
+        statistic_ids = {
+            statistic_id for name in names for statistic_id in source_map[name]
+        }
+        segments = summary_segments(start_time, end_time)
+        metadata, *stats = await asyncio.gather(
+            recorder.get_instance(hass).async_add_executor_job(
+                partial(
+                    recorder.statistics.get_metadata,
+                    hass,
+                    statistic_ids=statistic_ids,
+                )
+            ),
+            *(
+                self.async_statistics(
+                    segment_start,
+                    segment_end,
+                    source_map[name],
+                    period,
+                    None,
+                    {"change"},
+                )
+                for name in names
+                for segment_start, segment_end, period in segments
+            ),
+        )
+
+        # name -> unit -> total, energy in kWh and volumes in m³
+        totals_by_unit: dict[str, dict[str | None, float]] = {}
+        for index, source_stats in enumerate(stats):
+            source_totals = totals_by_unit.setdefault(
+                names[index // len(segments)], {}
+            )
+            for statistic_id, rows in source_stats.items():
+                change = sum(row["change"] or 0.0 for row in rows)
+                unit = metadata.get(statistic_id, (None, {}))[1].get(
+                    "unit_of_measurement"
+                )
+                if unit in EnergyConverter.VALID_UNITS:
+                    change = EnergyConverter.convert(
+                        change, unit, UnitOfEnergy.KILO_WATT_HOUR
+                    )
+                    unit = UnitOfEnergy.KILO_WATT_HOUR
+                elif unit in VolumeConverter.VALID_UNITS:
+                    change = VolumeConverter.convert(
+                        change, unit, UnitOfVolume.CUBIC_METERS
+                    )
+                    unit = UnitOfVolume.CUBIC_METERS
+                source_totals[unit] = source_totals.get(unit, 0.0) + change
+
+        totals = {}
+        gas_by_unit = totals_by_unit.pop("gas consumption", {})
+        for name, source_totals in totals_by_unit.items():
+            totals[name] = sum(source_totals.values())
+        if len(gas_by_unit) == 1:
+            totals["gas consumption"] = next(iter(gas_by_unit.values()))
+        summary = {
+            "start": dt_util.as_local(start_time).isoformat(),
+            "end": dt_util.as_local(end_time).isoformat(),
+            "unit": UnitOfEnergy.KILO_WATT_HOUR,
+            "currency": hass.config.currency,
+            **summarize_energy(totals),
+        }
+        if len(gas_by_unit) > 1:
+            # Gas metered by energy and by volume cannot be added up
+            summary["gas_consumption"] = {
+                unit: round(total, 3) for unit, total in gas_by_unit.items()
+            }
+        elif gas_by_unit and UnitOfEnergy.KILO_WATT_HOUR not in gas_by_unit:
+            summary["gas_unit"] = next(iter(gas_by_unit))
+        return summary
+
+    async def async_statistics(
+        self,
+        start_time,
+        end_time,
+        statistic_ids: list[str],
+        period: str,
+        units: dict[str, str] | None,
+        types: set[str],
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Return statistics from the energy rollup store or the statistics cache."""
+        stats = None
+        if types == {"change"} and not units:
+            stats = await self._rollup.async_statistics(
+                start_time, end_time, statistic_ids, period
+            )
+        if stats is None:
+            stats = await self._statistics.async_get(
+                start_time, end_time, statistic_ids, period, units, types
+            )
+        return stats
+
+    async def get_state_history(
+        self,
+        hass: HomeAssistant,
+        function,
+        arguments,
+        user_input: conversation.ConversationInput,
+        exposed_entities,
+    ):
+        """Answer a state history question with a prepared recorder query."""
+        query = arguments.get("query")
+        entity_id = arguments.get("entity_id")
+        state = arguments.get("state")
+        if not entity_id:
+            return "entity_id is required"
+        self.validate_entity_ids(hass, [entity_id], exposed_entities)
+
+        now = dt_util.utcnow()
+        if query == "state_at_time":
+            point_in_time = self.as_utc(arguments.get("time"), now, "time not valid")
+            return await async_state_at_time(
+                SQLITE_POOL, hass, entity_id, point_in_time
+            )
+        if query == "on_duration":
+            end_time = self.as_utc(arguments.get("end_time"), now, "end_time not valid")
+            start_time = self.as_utc(
+                arguments.get("start_time"),
+                end_time - timedelta(days=1),
+                "start_time not valid",
+            )
+            return await async_state_duration(
+                SQLITE_POOL, hass, entity_id, state or "on", start_time, end_time
+            )
+        if query == "last_changed":
+            return await async_last_changed(SQLITE_POOL, hass, entity_id, state)
+        return (
+            f"Invalid query '{query}'. "
+            "Valid queries: state_at_time, on_duration, last_changed"
         )
 
     def as_utc(self, value: str, default_value, parse_error_message: str):
@@ -950,22 +1495,24 @@ class SqliteFunctionExecutor(FunctionExecutor):
                     vol.Optional("query"): str,
                     vol.Optional("db_url"): str,
                     vol.Optional("single"): bool,
+                    vol.Optional("format", default="rows"): vol.In(
+                        ["rows", "columnar"]
+                    ),
+                    vol.Optional("timeout", default=10): vol.Coerce(float),
+                    vol.Optional("max_rows", default=500): cv.positive_int,
+                    vol.Optional("max_bytes", default=32000): cv.positive_int,
                 }
             )
         )
 
     def is_exposed(self, entity_id, exposed_entities) -> bool:
-        return any(
-            exposed_entity["entity_id"] == entity_id
-            for exposed_entity in exposed_entities
-        )
+        return entity_id in exposed_entity_ids(exposed_entities)
 
     def is_exposed_entity_in_query(self, query: str, exposed_entities) -> bool:
-        exposed_entity_ids = list(
-            map(lambda e: f"'{e['entity_id']}'", exposed_entities)
-        )
+        entity_ids = exposed_entity_ids(exposed_entities)
+        # One pass over the quoted literals instead of a search per entity
         return any(
-            exposed_entity_id in query for exposed_entity_id in exposed_entity_ids
+            literal in entity_ids for literal in SQL_STRING_LITERAL.findall(query)
         )
 
     def raise_error(self, msg="Unexpected error occurred."):
@@ -1010,20 +1557,34 @@ class SqliteFunctionExecutor(FunctionExecutor):
         q = Template(query, hass).async_render(template_arguments)
         _LOGGER.info("Rendered query: %s", q)
 
-        with sqlite3.connect(db_url, uri=True) as conn:
-            cursor = conn.cursor().execute(q)
-            names = [description[0] for description in cursor.description]
+        single = function.get("single") is True
+        names, rows, truncated = await SQLITE_POOL.async_query(
+            hass,
+            db_url,
+            q,
+            function["timeout"],
+            1 if single else function["max_rows"],
+            function["max_bytes"],
+        )
 
-            if function.get("single") is True:
-                row = cursor.fetchone()
-                return {name: val for name, val in zip(names, row)}
+        if single:
+            return {name: val for name, val in zip(names, rows[0])} if rows else None
 
-            rows = cursor.fetchall()
-            result = []
-            for row in rows:
-                result.append({name: val for name, val in zip(names, row)})
+        if function.get("format") == "columnar":
+            result = encode_rows(names, rows)
+            if truncated:
+                result["truncated"] = True
             return result
 
+        result = []
+        for row in rows:
+            result.append({name: val for name, val in zip(names, row)})
+        if truncated:
+            return {"rows": result, "truncated": True}
+        return result
+
+
+SQLITE_POOL = SqlitePool()
 
 FUNCTION_EXECUTORS: dict[str, FunctionExecutor] = {
     "native": NativeFunctionExecutor(),
@@ -0,0 +1,144 @@
+"""Conversation history store for the OpenAI Energy Management Agent."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import time
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.json import json_bytes
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    CONF_HISTORY_MAX_BYTES,
+    CONF_HISTORY_MAX_CONVERSATIONS,
+    CONF_HISTORY_TTL,
+    CONF_PERSIST_HISTORY,
+    DEFAULT_HISTORY_MAX_BYTES,
+    DEFAULT_HISTORY_MAX_CONVERSATIONS,
+    DEFAULT_HISTORY_TTL,
+    DEFAULT_PERSIST_HISTORY,
+    DOMAIN,
+)
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 30
+
+
+def history_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the storage used to persist the history of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.history.{entry_id}", private=True)
+
+
+class ConversationHistory:
+    """LRU conversation store bounded by count, age and serialized size."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the history store."""
+        self.hass = hass
+        self.entry = entry
+        # conversation_id -> (messages, last used timestamp, serialized size)
+        self._conversations: OrderedDict[str, tuple[list[dict], float, int]] = (
+            OrderedDict()
+        )
+        self._total_bytes = 0
+        self._store = history_store(hass, entry.entry_id)
+
+    @property
+    def persist(self) -> bool:
+        """Return True if history should survive restarts."""
+        return self.entry.options.get(CONF_PERSIST_HISTORY, DEFAULT_PERSIST_HISTORY)
+
+    async def async_load(self) -> None:
+        """Load persisted conversations."""
+        if not self.persist:
+            return
+        data = await self._store.async_load()
+        if not data:
+            return
+        for conversation_id, conversation in data.get("conversations", {}).items():
+            self._async_put(
+                conversation_id, conversation["messages"], conversation["updated"]
+            )
+        self._async_evict()
+
+    async def async_flush(self) -> None:
+        """Write pending changes to disk."""
+        if self.persist:
+            await self._store.async_save(self._data_to_save())
+
+    @callback
+    def async_get(self, conversation_id: str | None) -> list[dict] | None:
+        """Return the messages of a conversation and mark it as recently used."""
+        if conversation_id is None:
+            return None
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            return None
+        messages, updated, _ = conversation
+        if time.time() - updated > self._ttl:
+            self._async_remove(conversation_id)
+            self._async_schedule_save()
+            return None
+        self._conversations.move_to_end(conversation_id)
+        return messages
+
+    @callback
+    def async_set(self, conversation_id: str, messages: list[dict]) -> None:
+        """Store the messages of a conversation."""
+        self._async_put(conversation_id, messages, time.time())
+        self._async_evict()
+        self._async_schedule_save()
+
+    @property
+    def _ttl(self) -> float:
+        return self.entry.options.get(CONF_HISTORY_TTL, DEFAULT_HISTORY_TTL) * 60
+
+    @callback
+    def _async_put(self, conversation_id: str, messages: list[dict], updated: float):
+        self._async_remove(conversation_id)
+        size = len(json_bytes(messages))
+        self._conversations[conversation_id] = (messages, updated, size)
+        self._total_bytes += size
+
+    @callback
+    def _async_remove(self, conversation_id: str) -> None:
+        conversation = self._conversations.pop(conversation_id, None)
+        if conversation is not None:
+            self._total_bytes -= conversation[2]
+
+    @callback
+    def _async_evict(self) -> None:
+        """Drop expired conversations, then least recently used ones over budget."""
+        max_conversations = self.entry.options.get(
+            CONF_HISTORY_MAX_CONVERSATIONS, DEFAULT_HISTORY_MAX_CONVERSATIONS
+        )
+        max_bytes = self.entry.options.get(
+            CONF_HISTORY_MAX_BYTES, DEFAULT_HISTORY_MAX_BYTES
+        )
+        expired_before = time.time() - self._ttl
+        for conversation_id, (_, updated, _) in list(self._conversations.items()):
+            if updated < expired_before:
+                self._async_remove(conversation_id)
+
+        # Always keep the most recent conversation, even if it alone is over budget
+        while len(self._conversations) > 1 and (
+            len(self._conversations) > max_conversations
+            or self._total_bytes > max_bytes
+        ):
+            self._async_remove(next(iter(self._conversations)))
+
+    @callback
+    def _async_schedule_save(self) -> None:
+        if self.persist:
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict:
+        return {
+            "conversations": {
+                conversation_id: {"updated": updated, "messages": messages}
+                for conversation_id, (messages, updated, _) in self._conversations.items()
+            }
+        }
@@ -0,0 +1,94 @@
+"""Image preprocessing for the query_image service."""
+
+from __future__ import annotations
+
+import base64
+from collections import OrderedDict
+import io
+import logging
+import mimetypes
+import os
+from threading import Lock
+
+_LOGGER = logging.getLogger(__name__)
+
+# Longest edge the model keeps for each detail level, larger images are downscaled
+# by the API anyway so sending more pixels only costs upload bytes
+DETAIL_MAX_EDGE = {"low": 512, "high": 2048}
+# The high detail tier also scales the shortest edge down to this size
+HIGH_DETAIL_SHORT_EDGE = 768
+IMAGE_FORMATS = {"jpeg": "image/jpeg", "webp": "image/webp"}
+IMAGE_CACHE_SIZE = 32
+
+_cache: OrderedDict[tuple, str] = OrderedDict()
+_cache_lock = Lock()
+
+
+def target_size(
+    width: int, height: int, max_edge: int, detail: str
+) -> tuple[int, int]:
+    """Return the size an image is downscaled to, never upscaling it."""
+    scale = 1.0
+    if max_edge:
+        scale = min(scale, max_edge / max(width, height))
+    if detail in DETAIL_MAX_EDGE:
+        scale = min(scale, DETAIL_MAX_EDGE[detail] / max(width, height))
+    if detail == "high":
+        scale = min(scale, HIGH_DETAIL_SHORT_EDGE / min(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def encode_image(
+    path: str, max_edge: int, detail: str, image_format: str, quality: int
+) -> str:
+    """Return a local image as a data URL, downscaled and recompressed.
+
+    Runs in the executor. Results are cached by path, modification time and size,
+    so an unchanged snapshot is only processed once.
+    """
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size, max_edge, detail)
+    key += (image_format, quality)
+    with _cache_lock:
+        if (data_url := _cache.get(key)) is not None:
+            _cache.move_to_end(key)
+            return data_url
+
+    with open(path, "rb") as image_file:
+        data = image_file.read()
+    try:
+        data, mime_type = _recompress(data, max_edge, detail, image_format, quality)
+    except ImportError:
+        _LOGGER.debug("Pillow is not installed, sending %s unprocessed", path)
+        mime_type, _ = mimetypes.guess_type(path)
+    data_url = f"data:{mime_type};base64,{base64.b64encode(data).decode('utf-8')}"
+
+    with _cache_lock:
+        _cache[key] = data_url
+        while len(_cache) > IMAGE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return data_url
+
+
+def _recompress(
+    data: bytes, max_edge: int, detail: str, image_format: str, quality: int
+) -> tuple[bytes, str]:
+    # pylint: disable-next=import-outside-toplevel
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as original:
+        original_mime_type = Image.MIME.get(original.format)
+        image = ImageOps.exif_transpose(original)
+        size = target_size(image.width, image.height, max_edge, detail)
+        resized = size != image.size
+        if resized:
+            image = image.resize(size, Image.Resampling.LANCZOS)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        output = io.BytesIO()
+        image.save(output, format=image_format.upper(), quality=quality)
+
+    # An already small, well compressed snapshot is sent as it is
+    if not resized and original_mime_type and len(output.getvalue()) >= len(data):
+        return data, original_mime_type
+    return output.getvalue(), IMAGE_FORMATS[image_format]
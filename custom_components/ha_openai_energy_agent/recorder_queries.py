@@ -0,0 +1,166 @@
+"""Parameterized recorder queries for common state history questions.
+
+The statements only filter on states.metadata_id and states.last_updated_ts, so
+SQLite answers them from the ix_states_metadata_id_last_updated_ts index. The
+statement text never changes, only the bound parameters do, so every pooled
+connection prepares each statement once and reuses it from its statement cache.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from homeassistant.components import recorder
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.util.dt as dt_util
+
+from .sqlite_pool import SqlitePool
+
+QUERY_TIMEOUT = 10
+QUERY_MAX_BYTES = 1 << 16
+
+STATE_AT_TIME = """
+SELECT state, COALESCE(last_changed_ts, last_updated_ts) AS last_changed_ts
+FROM states
+WHERE metadata_id = (SELECT metadata_id FROM states_meta WHERE entity_id = :entity_id)
+  AND last_updated_ts <= :time
+ORDER BY last_updated_ts DESC
+LIMIT 1
+"""
+# Rows with a NULL last_changed_ts are the ones where the state itself changed,
+# the others only updated attributes
+LAST_CHANGED = """
+SELECT state, last_updated_ts AS last_changed_ts
+FROM states
+WHERE metadata_id = (SELECT metadata_id FROM states_meta WHERE entity_id = :entity_id)
+  AND last_changed_ts IS NULL
+ORDER BY last_updated_ts DESC
+LIMIT 1
+"""
+LAST_CHANGED_TO_STATE = """
+SELECT state, last_updated_ts AS last_changed_ts
+FROM states
+WHERE metadata_id = (SELECT metadata_id FROM states_meta WHERE entity_id = :entity_id)
+  AND last_changed_ts IS NULL
+  AND state = :state
+ORDER BY last_updated_ts DESC
+LIMIT 1
+"""
+STATE_DURATION = """
+WITH meta AS (
+  SELECT metadata_id FROM states_meta WHERE entity_id = :entity_id
+), changes AS (
+  SELECT * FROM (
+    SELECT state, :start AS ts
+    FROM states
+    WHERE metadata_id = (SELECT metadata_id FROM meta) AND last_updated_ts <= :start
+    ORDER BY last_updated_ts DESC
+    LIMIT 1
+  )
+  UNION ALL
+  SELECT state, last_updated_ts AS ts
+  FROM states
+  WHERE metadata_id = (SELECT metadata_id FROM meta)
+    AND last_updated_ts > :start
+    AND last_updated_ts < :end
+    AND last_changed_ts IS NULL
+)
+SELECT COALESCE(SUM(next_ts - ts), 0) AS seconds, COUNT(*) AS periods
+FROM (
+  SELECT state, ts, COALESCE(LEAD(ts) OVER (ORDER BY ts), :end) AS next_ts
+  FROM changes
+)
+WHERE state = :state
+"""
+
+
+def recorder_db_url(hass: HomeAssistant) -> str:
+    """Return a read-only URI of the recorder database."""
+    db_url = recorder.get_instance(hass).db_url
+    prefix = "sqlite:///"
+    if not db_url.startswith(prefix) or ":memory:" in db_url:
+        raise HomeAssistantError("State history queries need the SQLite recorder")
+    return f"file:{db_url[len(prefix):]}?mode=ro"
+
+
+async def async_state_at_time(
+    pool: SqlitePool, hass: HomeAssistant, entity_id: str, point_in_time: datetime
+) -> dict[str, Any] | None:
+    """Return the state of an entity at a point in time."""
+    row = await _async_query_one(
+        pool,
+        hass,
+        STATE_AT_TIME,
+        {"entity_id": entity_id, "time": point_in_time.timestamp()},
+    )
+    return _as_state(entity_id, row)
+
+
+async def async_last_changed(
+    pool: SqlitePool, hass: HomeAssistant, entity_id: str, state: str | None
+) -> dict[str, Any] | None:
+    """Return when an entity last changed state, or last changed to a state."""
+    if state is None:
+        row = await _async_query_one(
+            pool, hass, LAST_CHANGED, {"entity_id": entity_id}
+        )
+    else:
+        row = await _async_query_one(
+            pool,
+            hass,
+            LAST_CHANGED_TO_STATE,
+            {"entity_id": entity_id, "state": state},
+        )
+    return _as_state(entity_id, row)
+
+
+async def async_state_duration(
+    pool: SqlitePool,
+    hass: HomeAssistant,
+    entity_id: str,
+    state: str,
+    start: datetime,
+    end: datetime,
+) -> dict[str, Any]:
+    """Return how long an entity was in a state between two points in time."""
+    seconds, periods = await _async_query_one(
+        pool,
+        hass,
+        STATE_DURATION,
+        {
+            "entity_id": entity_id,
+            "state": state,
+            "start": start.timestamp(),
+            "end": end.timestamp(),
+        },
+    )
+    return {
+        "entity_id": entity_id,
+        "state": state,
+        "seconds": round(seconds),
+        "periods": periods,
+    }
+
+
+async def _async_query_one(
+    pool: SqlitePool, hass: HomeAssistant, query: str, params: dict[str, Any]
+) -> tuple | None:
+    _, rows, _ = await pool.async_query(
+        hass, recorder_db_url(hass), query, QUERY_TIMEOUT, 1, QUERY_MAX_BYTES, params
+    )
+    return rows[0] if rows else None
+
+
+def _as_state(entity_id: str, row: tuple | None) -> dict[str, Any] | None:
+    if row is None:
+        return None
+    state, last_changed = row
+    return {
+        "entity_id": entity_id,
+        "state": state,
+        "last_changed": dt_util.as_local(
+            dt_util.utc_from_timestamp(last_changed)
+        ).isoformat(),
+    }
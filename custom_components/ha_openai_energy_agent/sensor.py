@@ -0,0 +1,60 @@
+"""Sensor platform for the OpenAI Energy Management Agent."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import SIGNAL_PROMPT_TOKENS
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the diagnostic sensors."""
+    async_add_entities([PromptTokensSensor(entry)])
+
+
+class PromptTokensSensor(SensorEntity):
+    """Prompt tokens of the last request, with a breakdown per component."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = "tokens"
+    _attr_icon = "mdi:counter"
+    _attr_should_poll = False
+    _unrecorded_attributes = frozenset(
+        {"tools_by_name", "largest_entities", "tokenizer"}
+    )
+
+    def __init__(self, entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        self.entry = entry
+        self._attr_name = f"{entry.title} Prompt Tokens"
+        self._attr_unique_id = f"{entry.entry_id}_prompt_tokens"
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to token breakdowns of the agent."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_PROMPT_TOKENS.format(self.entry.entry_id),
+                self._async_update_breakdown,
+            )
+        )
+
+    @callback
+    def _async_update_breakdown(self, breakdown: dict[str, Any]) -> None:
+        self._attr_native_value = breakdown["total"]
+        self._attr_extra_state_attributes = {
+            key: value for key, value in breakdown.items() if key != "total"
+        }
+        self.async_write_ha_state()
@@ -1,7 +1,6 @@
-import base64
+import asyncio
 import logging
 import mimetypes
-from pathlib import Path
 from urllib.parse import urlparse
 
 from openai import AsyncOpenAI
@@ -21,19 +20,56 @@ from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import config_validation as cv, selector
 from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN, SERVICE_QUERY_IMAGE
+from .const import DATA_AGENT, DOMAIN, SERVICE_QUERY_IMAGE, SERVICE_QUERY_IMAGES
+from .image import IMAGE_FORMATS, encode_image
+
+IMAGES_SCHEMA = vol.All(cv.ensure_list, [{"url": cv.string}])
+
+# Options shared by a single query and a batch of jobs
+QUERY_OPTIONS = {
+    vol.Required("config_entry"): selector.ConfigEntrySelector(
+        {
+            "integration": DOMAIN,
+        }
+    ),
+    vol.Required("model", default="gpt-5"): cv.string,
+    vol.Optional("max_tokens", default=300): cv.positive_int,
+    vol.Optional("detail", default="auto"): vol.In(["auto", "low", "high"]),
+    vol.Optional("max_edge", default=1536): vol.All(vol.Coerce(int), vol.Range(min=0)),
+    vol.Optional("image_format", default="jpeg"): vol.In(list(IMAGE_FORMATS)),
+    vol.Optional("quality", default=85): vol.All(
+        vol.Coerce(int), vol.Range(min=1, max=100)
+    ),
+}
 
 QUERY_IMAGE_SCHEMA = vol.Schema(
     {
-        vol.Required("config_entry"): selector.ConfigEntrySelector(
-            {
-                "integration": DOMAIN,
-            }
-        ),
-        vol.Required("model", default="gpt-5"): cv.string,
+        **QUERY_OPTIONS,
         vol.Required("prompt"): cv.string,
-        vol.Required("images"): vol.All(cv.ensure_list, [{"url": cv.string}]),
-        vol.Optional("max_tokens", default=300): cv.positive_int,
+        vol.Required("images"): IMAGES_SCHEMA,
+    }
+)
+
+QUERY_IMAGES_SCHEMA = vol.Schema(
+    {
+        **QUERY_OPTIONS,
+        vol.Required("jobs"): vol.All(
+            cv.ensure_list,
+            [
+                {
+                    vol.Required("name"): cv.string,
+                    vol.Required("prompt"): cv.string,
+                    vol.Required("images"): IMAGES_SCHEMA,
+                }
+            ],
+            vol.Length(min=1),
+        ),
+        vol.Optional("max_concurrency", default=4): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+        vol.Optional("timeout", default=60): vol.All(
+            vol.Coerce(float), vol.Range(min=1)
+        ),
     }
 )
 
@@ -46,40 +82,35 @@ async def async_setup_services(hass: HomeAssistant, config: ConfigType) -> None:
     async def query_image(call: ServiceCall) -> ServiceResponse:
         """Query an image."""
         try:
-            model = call.data["model"]
-            images = [
-                {"type": "image_url", "image_url": to_image_param(hass, image)}
-                for image in call.data["images"]
-            ]
-
-            messages = [
-                {
-                    "role": "user",
-                    "content": [{"type": "text", "text": call.data["prompt"]}] + images,
-                }
-            ]
-            _LOGGER.info("Prompt for %s: %s", model, messages)
-
-            # GPT-5 and o1 models use max_completion_tokens instead of max_tokens
-            token_param = {}
-            if model.startswith("gpt-5") or model.startswith("o1"):
-                token_param["max_completion_tokens"] = call.data["max_tokens"]
-            else:
-                token_param["max_tokens"] = call.data["max_tokens"]
-
-            response = await AsyncOpenAI(
-                api_key=hass.data[DOMAIN][call.data["config_entry"]]["api_key"]
-            ).chat.completions.create(
-                model=model,
-                messages=messages,
-                **token_param,
+            return await async_query_image(
+                hass, call.data, call.data["prompt"], call.data["images"]
             )
-            response_dict = response.model_dump()
-            _LOGGER.info("Response %s", response_dict)
         except OpenAIError as err:
             raise HomeAssistantError(f"Error generating image: {err}") from err
 
-        return response_dict
+    async def query_images(call: ServiceCall) -> ServiceResponse:
+        """Run several image queries concurrently, keyed by job name."""
+        semaphore = asyncio.Semaphore(call.data["max_concurrency"])
+
+        async def run(job) -> dict:
+            async with semaphore:
+                try:
+                    async with asyncio.timeout(call.data["timeout"]):
+                        return await async_query_image(
+                            hass, call.data, job["prompt"], job["images"]
+                        )
+                except TimeoutError:
+                    return {"error": f"Timed out after {call.data['timeout']}s"}
+                except (OpenAIError, HomeAssistantError) as err:
+                    return {"error": str(err)}
+
+        jobs = call.data["jobs"]
+        if len({job["name"] for job in jobs}) != len(jobs):
+            raise HomeAssistantError("Job names must be unique")
+        # Fail fast on a config entry that is not loaded instead of once per job
+        get_client(hass, call.data["config_entry"])
+        results = await asyncio.gather(*(run(job) for job in jobs))
+        return {job["name"]: result for job, result in zip(jobs, results)}
 
     hass.services.async_register(
         DOMAIN,
@@ -88,11 +119,67 @@ async def async_setup_services(hass: HomeAssistant, config: ConfigType) -> None:
         schema=QUERY_IMAGE_SCHEMA,
         supports_response=SupportsResponse.ONLY,
     )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_QUERY_IMAGES,
+        query_images,
+        schema=QUERY_IMAGES_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+
+async def async_query_image(
+    hass: HomeAssistant, options, prompt: str, images
+) -> dict:
+    """Send a prompt with images and return the response as a dict."""
+    model = options["model"]
+    image_params = [
+        {
+            "type": "image_url",
+            "image_url": await async_to_image_param(hass, image, options),
+        }
+        for image in images
+    ]
+
+    messages = [
+        {
+            "role": "user",
+            "content": [{"type": "text", "text": prompt}] + image_params,
+        }
+    ]
+    _LOGGER.info("Prompt for %s: %s", model, messages)
+
+    # GPT-5 and o1 models use max_completion_tokens instead of max_tokens
+    token_param = {}
+    if model.startswith("gpt-5") or model.startswith("o1"):
+        token_param["max_completion_tokens"] = options["max_tokens"]
+    else:
+        token_param["max_tokens"] = options["max_tokens"]
+
+    response = await get_client(hass, options["config_entry"]).chat.completions.create(
+        model=model,
+        messages=messages,
+        **token_param,
+    )
+    response_dict = response.model_dump()
+    _LOGGER.info("Response %s", response_dict)
+    return response_dict
+
+
+def get_client(hass: HomeAssistant, entry_id: str) -> AsyncOpenAI:
+    """Return the client of a loaded config entry, reusing its connection pool."""
+    try:
+        return hass.data[DOMAIN][entry_id][DATA_AGENT].client
+    except KeyError as err:
+        raise HomeAssistantError(f"Config entry {entry_id} is not loaded") from err
 
 
-def to_image_param(hass: HomeAssistant, image) -> ChatCompletionContentPartImageParam:
-    """Convert url to base64 encoded image if local."""
+async def async_to_image_param(
+    hass: HomeAssistant, image, options
+) -> ChatCompletionContentPartImageParam:
+    """Convert url to a downscaled base64 encoded image if local."""
     url = image["url"]
+    image = {**image, "detail": options["detail"]}
 
     if urlparse(url).scheme in cv.EXTERNAL_URL_PROTOCOL_SCHEMA_LIST:
         return image
@@ -103,17 +190,22 @@ def to_image_param(hass: HomeAssistant, image) -> ChatCompletionContentPartImage
             "`allowlist_external_dirs` may need to be adjusted in "
             "`configuration.yaml`"
         )
-    if not Path(url).exists():
-        raise HomeAssistantError(f"`{url}` does not exist")
     mime_type, _ = mimetypes.guess_type(url)
     if mime_type is None or not mime_type.startswith("image"):
         raise HomeAssistantError(f"`{url}` is not an image")
 
-    image["url"] = f"data:{mime_type};base64,{encode_image(url)}"
+    try:
+        image["url"] = await hass.async_add_executor_job(
+            encode_image,
+            url,
+            options["max_edge"],
+            options["detail"],
+            options["image_format"],
+            options["quality"],
+        )
+    except FileNotFoundError as err:
+        raise HomeAssistantError(f"`{url}` does not exist") from err
+    except (OSError, ValueError) as err:
+        # Pillow raises UnidentifiedImageError, an OSError, for unreadable images
+        raise HomeAssistantError(f"Cannot process image `{url}`: {err}") from err
     return image
-
-
-def encode_image(image_path):
-    """Convert to base64 encoded image."""
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
@@ -0,0 +1,144 @@
+"""Read-only SQLite connections for the sqlite function executor."""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import sqlite3
+from threading import Lock
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from .exceptions import SqliteQueryTimeout
+
+# Queries run on their own threads so a slow query never holds up the recorder
+# or the default executor
+MAX_WORKERS = 2
+# SQLite virtual machine instructions between two timeout checks
+PROGRESS_INTERVAL = 1000
+# Rows fetched from the cursor at a time, memory stays flat whatever is selected
+FETCH_BATCH_SIZE = 256
+# Estimated size of a value that is not text or a blob
+SCALAR_SIZE = 8
+
+
+class SqlitePool:
+    """Run queries on a dedicated thread pool with reused connections per db_url."""
+
+    def __init__(self) -> None:
+        """Initialize the pool, threads and connections are created on demand."""
+        self._executor: ThreadPoolExecutor | None = None
+        self._connections: dict[str, list[sqlite3.Connection]] = {}
+        self._lock = Lock()
+
+    async def async_query(
+        self,
+        hass: HomeAssistant,
+        db_url: str,
+        query: str,
+        timeout: float,
+        max_rows: int,
+        max_bytes: int,
+        params: dict[str, Any] | tuple = (),
+    ) -> tuple[list[str], list[tuple], bool]:
+        """Run a query and return column names, rows and whether rows were cut.
+
+        Rows are read in batches until max_rows rows or about max_bytes bytes
+        of values have been read, the rest of the result is never materialized.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                MAX_WORKERS, thread_name_prefix="ha_openai_energy_agent_sqlite"
+            )
+        return await hass.loop.run_in_executor(
+            self._executor,
+            partial(
+                self._query, db_url, query, params, timeout, max_rows, max_bytes
+            ),
+        )
+
+    def shutdown(self) -> None:
+        """Close every connection and stop the threads."""
+        with self._lock:
+            connections = [
+                connection
+                for pool in self._connections.values()
+                for connection in pool
+            ]
+            self._connections.clear()
+        for connection in connections:
+            connection.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _query(
+        self,
+        db_url: str,
+        query: str,
+        params: dict[str, Any] | tuple,
+        timeout: float,
+        max_rows: int,
+        max_bytes: int,
+    ) -> tuple[list[str], list[tuple], bool]:
+        connection = self._acquire(db_url)
+        deadline = time.monotonic() + timeout
+        # A non-zero return value interrupts the running statement
+        connection.set_progress_handler(
+            lambda: time.monotonic() > deadline, PROGRESS_INTERVAL
+        )
+        cursor = None
+        try:
+            # Statements are prepared once per connection by its statement cache
+            cursor = connection.execute(query, params)
+            names = [description[0] for description in cursor.description or ()]
+            rows, truncated = _fetch(cursor, max_rows, max_bytes)
+        except sqlite3.OperationalError as err:
+            if time.monotonic() > deadline:
+                raise SqliteQueryTimeout(timeout) from err
+            raise
+        finally:
+            # An unfinished statement would keep the read transaction open for
+            # the next borrower of the connection
+            if cursor is not None:
+                cursor.close()
+            connection.set_progress_handler(None, 0)
+            self._release(db_url, connection)
+        return names, rows, truncated
+
+    def _acquire(self, db_url: str) -> sqlite3.Connection:
+        with self._lock:
+            if pool := self._connections.get(db_url):
+                return pool.pop()
+        connection = sqlite3.connect(db_url, uri=True, check_same_thread=False)
+        connection.execute("PRAGMA query_only = ON")
+        return connection
+
+    def _release(self, db_url: str, connection: sqlite3.Connection) -> None:
+        if connection.in_transaction:
+            connection.rollback()
+        with self._lock:
+            pool = self._connections.setdefault(db_url, [])
+            if len(pool) < MAX_WORKERS:
+                pool.append(connection)
+                return
+        connection.close()
+
+
+def _fetch(
+    cursor: sqlite3.Cursor, max_rows: int, max_bytes: int
+) -> tuple[list[tuple], bool]:
+    rows: list[tuple] = []
+    size = 0
+    while batch := cursor.fetchmany(FETCH_BATCH_SIZE):
+        for row in batch:
+            if len(rows) >= max_rows or size >= max_bytes:
+                return rows, True
+            rows.append(row)
+            size += sum(
+                len(value) if isinstance(value, (str, bytes)) else SCALAR_SIZE
+                for value in row
+            )
+    return rows, False
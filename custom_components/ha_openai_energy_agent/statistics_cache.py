@@ -0,0 +1,218 @@
+"""Long-term statistics cache for the get_statistics tool."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import json
+import time
+from typing import Any
+
+from homeassistant.components import recorder
+from homeassistant.core import HomeAssistant
+import homeassistant.util.dt as dt_util
+
+FIXED_PERIODS = {"5minute": 300, "hour": 3600}
+# Buckets ending this recently may still be recompiled by the recorder
+SETTLE_TIME = timedelta(minutes=15)
+# Seconds a cached bucket is trusted, statistics can be adjusted or imported later
+CACHE_TTL = 3600
+MAX_CACHED_SERIES = 256
+
+
+def period_start(timestamp: float, period: str) -> float:
+    """Return the start of the bucket a timestamp falls into."""
+    if period in FIXED_PERIODS:
+        return timestamp - timestamp % FIXED_PERIODS[period]
+    local = datetime.fromtimestamp(timestamp, tz=dt_util.DEFAULT_TIME_ZONE).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    if period == "week":
+        local -= timedelta(days=local.weekday())
+    elif period == "month":
+        local = local.replace(day=1)
+    return local.timestamp()
+
+
+def period_end(start: float, period: str) -> float:
+    """Return the end of the bucket starting at a timestamp."""
+    if period in FIXED_PERIODS:
+        return start + FIXED_PERIODS[period]
+    local = datetime.fromtimestamp(start, tz=dt_util.DEFAULT_TIME_ZONE)
+    if period == "day":
+        local += timedelta(days=1)
+    elif period == "week":
+        local += timedelta(days=7)
+    else:
+        # Adding 4 days to the 28th always lands in the next month
+        local = (local.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return local.replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+
+class StatisticsCache:
+    """Serve statistics_during_period from per-bucket rows where possible.
+
+    Rows of completed, aligned buckets are kept per (statistic_id, period, units,
+    types), so overlapping requests only query the recorder for the buckets they
+    do not share. Identical recorder queries running at the same time are
+    coalesced into one.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the cache."""
+        self.hass = hass
+        # series key -> bucket start -> (cached at, row or None when empty)
+        self._series: OrderedDict[tuple, dict[float, tuple[float, Any]]] = (
+            OrderedDict()
+        )
+        self._inflight: dict[tuple, asyncio.Future] = {}
+
+    async def async_get(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        statistic_ids: list[str],
+        period: str,
+        units: dict[str, str] | None,
+        types: set[str],
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Return the statistics of a period, like statistics_during_period."""
+        options = (
+            period,
+            json.dumps(units, sort_keys=True),
+            tuple(sorted(types)),
+        )
+        start = start_time.timestamp()
+        end = end_time.timestamp()
+        first = period_start(start, period)
+        if first < start:
+            first = period_end(first, period)
+        settled = (dt_util.utcnow() - SETTLE_TIME).timestamp()
+
+        # Aligned buckets that are complete can be served from the cache
+        buckets = []
+        bucket = first
+        while (bucket_end := period_end(bucket, period)) <= min(end, settled):
+            buckets.append(bucket)
+            bucket = bucket_end
+        cached_until = bucket if buckets else first
+
+        result: dict[str, list[dict[str, Any]]] = {}
+        segments: dict[tuple[float, float], list[str]] = {}
+        for statistic_id in statistic_ids:
+            rows = self._cached_rows((statistic_id, *options), buckets)
+            for missing_start, missing_end in _missing_ranges(rows, buckets, period):
+                segments.setdefault((missing_start, missing_end), []).append(
+                    statistic_id
+                )
+            result[statistic_id] = [row for row in rows.values() if row is not None]
+
+        if buckets:
+            if start < first:
+                segments[(start, first)] = list(statistic_ids)
+            if cached_until < end:
+                segments[(cached_until, end)] = list(statistic_ids)
+        else:
+            segments = {(start, end): list(statistic_ids)}
+
+        fetched = await asyncio.gather(
+            *(
+                self._async_fetch(segment_start, segment_end, ids, options, units)
+                for (segment_start, segment_end), ids in segments.items()
+            )
+        )
+        for ((segment_start, segment_end), ids), rows in zip(
+            segments.items(), fetched
+        ):
+            cacheable = [
+                bucket for bucket in buckets if segment_start <= bucket < segment_end
+            ]
+            for statistic_id in ids:
+                statistic_rows = rows.get(statistic_id, [])
+                result[statistic_id].extend(statistic_rows)
+                if cacheable:
+                    self._store((statistic_id, *options), cacheable, statistic_rows)
+
+        return {
+            statistic_id: sorted(rows, key=lambda row: row["start"])
+            for statistic_id, rows in result.items()
+            if rows
+        }
+
+    def _cached_rows(self, key: tuple, buckets: list[float]) -> dict[float, Any]:
+        series = self._series.get(key)
+        if series is None:
+            return {}
+        self._series.move_to_end(key)
+        expired_before = time.monotonic() - CACHE_TTL
+        return {
+            bucket: series[bucket][1]
+            for bucket in buckets
+            if bucket in series and series[bucket][0] > expired_before
+        }
+
+    def _store(self, key: tuple, buckets: list[float], rows: list[dict]) -> None:
+        series = self._series.setdefault(key, {})
+        self._series.move_to_end(key)
+        now = time.monotonic()
+        by_start = {row["start"]: row for row in rows}
+        for bucket in buckets:
+            series[bucket] = (now, by_start.get(bucket))
+        while len(self._series) > MAX_CACHED_SERIES:
+            self._series.popitem(last=False)
+
+    async def _async_fetch(
+        self,
+        start: float,
+        end: float,
+        statistic_ids: list[str],
+        options: tuple,
+        units: dict[str, str] | None,
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Query the recorder, sharing the result with identical queries in flight."""
+        key = (start, end, tuple(sorted(statistic_ids)), *options)
+        if (future := self._inflight.get(key)) is not None:
+            return await asyncio.shield(future)
+
+        future = self.hass.loop.create_future()
+        self._inflight[key] = future
+        try:
+            result = await recorder.get_instance(self.hass).async_add_executor_job(
+                recorder.statistics.statistics_during_period,
+                self.hass,
+                dt_util.utc_from_timestamp(start),
+                dt_util.utc_from_timestamp(end),
+                set(statistic_ids),
+                options[0],
+                units,
+                set(options[2]),
+            )
+        except Exception as err:
+            future.set_exception(err)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+            if not future.done():
+                future.cancel()
+
+
+def _missing_ranges(
+    rows: dict[float, Any], buckets: list[float], period: str
+) -> list[tuple[float, float]]:
+    """Return contiguous ranges of the buckets that are not cached."""
+    ranges = []
+    for bucket in buckets:
+        if bucket in rows:
+            continue
+        bucket_end = period_end(bucket, period)
+        if ranges and ranges[-1][1] == bucket:
+            ranges[-1] = (ranges[-1][0], bucket_end)
+        else:
+            ranges.append((bucket, bucket_end))
+    return ranges
@@ -0,0 +1,173 @@
+"""Local token counts for the OpenAI Energy Management Agent."""
+
+from __future__ import annotations
+
+import asyncio
+from functools import lru_cache
+import heapq
+import json
+import logging
+import math
+import os
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import STORAGE_DIR
+
+_LOGGER = logging.getLogger(__name__)
+
+# Tokens added by the chat format around every message and the reply
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_OVERHEAD_TOKENS = 3
+# Tokens charged for an image at low detail
+IMAGE_TOKENS = 85
+# Average UTF-8 bytes per token while the tokenizer is not loaded
+BYTES_PER_TOKEN = 4
+
+# o200k_base is the encoding of the gpt-4o, o1 and gpt-5 models
+ENCODING_NAME = "o200k_base"
+# Directory under .storage the downloaded encoding file is kept in
+ENCODING_CACHE_DIR = "ha_openai_energy_agent.tiktoken"
+
+_encoding = None
+_load_task: asyncio.Task | None = None
+
+
+@callback
+def async_load_tokenizer(hass: HomeAssistant) -> None:
+    """Load the tiktoken encoding in the background, estimates are used until then.
+
+    The encoding file is downloaded once and kept under .storage, when the
+    download fails the estimates are kept and it is tried again on the next setup.
+    """
+    global _load_task  # pylint: disable=global-statement
+
+    if _encoding is not None or (_load_task is not None and not _load_task.done()):
+        return
+    _load_task = hass.async_create_background_task(
+        _async_load_encoding(hass), "ha_openai_energy_agent tokenizer"
+    )
+
+
+async def _async_load_encoding(hass: HomeAssistant) -> None:
+    global _encoding  # pylint: disable=global-statement
+
+    cache_dir = hass.config.path(STORAGE_DIR, ENCODING_CACHE_DIR)
+
+    def load():
+        import tiktoken  # pylint: disable=import-outside-toplevel
+
+        # tiktoken reads the cache directory from the environment on every load
+        os.environ.setdefault("TIKTOKEN_CACHE_DIR", cache_dir)
+        return tiktoken.get_encoding(ENCODING_NAME)
+
+    try:
+        _encoding = await hass.async_add_executor_job(load)
+    except ImportError as err:
+        _LOGGER.warning("Using estimated token counts, tiktoken is missing: %s", err)
+    except (OSError, ValueError) as err:
+        # requests errors are OSErrors, a corrupted download raises ValueError
+        _LOGGER.warning(
+            "Using estimated token counts, unable to load the %s encoding: %s",
+            ENCODING_NAME,
+            err,
+        )
+    else:
+        count_text_tokens.cache_clear()
+
+
+# Strings are immutable and cache their hash, so repeated messages are counted once
+@lru_cache(maxsize=4096)
+def count_text_tokens(text: str) -> int:
+    """Return the number of tokens of a text."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text.encode("utf-8")) / BYTES_PER_TOKEN)
+
+
+def count_message_tokens(message: dict[str, Any]) -> int:
+    """Return the number of prompt tokens a chat message takes."""
+    tokens = MESSAGE_OVERHEAD_TOKENS
+    content = message.get("content")
+    if isinstance(content, str):
+        tokens += count_text_tokens(content)
+    elif isinstance(content, list):
+        for part in content:
+            if part.get("type") == "text":
+                tokens += count_text_tokens(part.get("text", ""))
+            else:
+                tokens += IMAGE_TOKENS
+    if name := message.get("name"):
+        tokens += count_text_tokens(name)
+    if function_call := message.get("function_call"):
+        tokens += count_text_tokens(function_call.get("name", ""))
+        tokens += count_text_tokens(function_call.get("arguments", ""))
+    for tool_call in message.get("tool_calls") or []:
+        function = tool_call.get("function", {})
+        tokens += count_text_tokens(function.get("name", ""))
+        tokens += count_text_tokens(function.get("arguments", ""))
+    return tokens
+
+
+def count_messages_tokens(messages: list[dict[str, Any]]) -> int:
+    """Return the number of prompt tokens of a list of chat messages."""
+    return REPLY_OVERHEAD_TOKENS + sum(
+        count_message_tokens(message) for message in messages
+    )
+
+
+def count_tools_tokens(tools: list[dict[str, Any]]) -> int:
+    """Return the number of prompt tokens the tool definitions take."""
+    if not tools:
+        return 0
+    return count_text_tokens(json.dumps(tools, separators=(",", ":")))
+
+
+def count_entity_tokens(entity: dict[str, Any]) -> int:
+    """Return the tokens of an entity row in the default prompt table."""
+    return count_text_tokens(
+        f"{entity['entity_id']},{entity['name']},{entity['state']},"
+        f"{'/'.join(entity['aliases'])}\n"
+    )
+
+
+def count_entities_tokens(entities: list[dict[str, Any]]) -> dict[str, int]:
+    """Return the tokens of each entity row in the default prompt table."""
+    return {entity["entity_id"]: count_entity_tokens(entity) for entity in entities}
+
+
+def token_breakdown(
+    messages: list[dict[str, Any]],
+    tools_by_name: dict[str, int],
+    tools_total: int,
+    entity_tokens: dict[str, int],
+    top: int = 10,
+) -> dict[str, Any]:
+    """Return the prompt tokens of a request split by component.
+
+    entity_tokens holds the tokens of the entities rendered into the prompt.
+    """
+    system_prompt = count_message_tokens(messages[0]) if messages else 0
+    tool_results = sum(
+        count_message_tokens(message)
+        for message in messages
+        if message["role"] in ("tool", "function")
+    )
+    conversation = sum(count_message_tokens(message) for message in messages[1:])
+
+    return {
+        "total": REPLY_OVERHEAD_TOKENS + system_prompt + conversation + tools_total,
+        "system_prompt": system_prompt,
+        "exposed_entities": sum(entity_tokens.values()),
+        "exposed_entity_count": len(entity_tokens),
+        "conversation": conversation - tool_results,
+        "tool_results": tool_results,
+        "tools": tools_total,
+        "tools_by_name": tools_by_name,
+        "largest_entities": dict(
+            heapq.nlargest(top, entity_tokens.items(), key=lambda item: item[1])
+        ),
+        "tokenizer": "tiktoken" if _encoding is not None else "estimate",
+    }
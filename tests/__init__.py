@@ -0,0 +1 @@
+"""Tests for the OpenAI Energy Management Agent integration."""
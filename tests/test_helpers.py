@@ -0,0 +1,275 @@
+"""Tests for the function executor helpers."""
+
+import asyncio
+from datetime import datetime, timedelta
+import json
+from types import SimpleNamespace
+from typing import Any
+
+from homeassistant.core import Context, State
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.util.dt as dt_util
+
+from custom_components.ha_openai_energy_agent.helpers import (
+    NativeFunctionExecutor,
+    encode_tool_result,
+    summary_segments,
+)
+
+
+def test_encode_tool_result_state() -> None:
+    """Test a State is encoded without its context and empty attributes."""
+    state = State("sensor.grid_power", "1200", {}, context=Context())
+
+    result = json.loads(encode_tool_result([state], 0))
+
+    assert result[0]["entity_id"] == "sensor.grid_power"
+    assert result[0]["state"] == "1200"
+    assert "context" not in result[0]
+    assert "attributes" not in result[0]
+    # The cached dict of the state is left untouched
+    assert "context" in state.as_dict()
+
+
+def test_encode_tool_result_state_dict() -> None:
+    """Test a state that is already a dict is encoded without its context."""
+    state = State("light.kitchen", "on", {"brightness": 255}).as_dict()
+
+    result = json.loads(encode_tool_result({"states": [state]}, 0))
+
+    assert result["states"][0]["attributes"] == {"brightness": 255}
+    assert "context" not in result["states"][0]
+
+
+def test_encode_tool_result_unknown_types() -> None:
+    """Test bytes, durations and unknown objects do not break the encoding."""
+    result = json.loads(
+        encode_tool_result(
+            {
+                "context_id_bin": b"\x01\xff",
+                "duration": timedelta(minutes=1, seconds=30),
+                "other": object,
+            },
+            0,
+        )
+    )
+
+    assert result["context_id_bin"] == "01ff"
+    assert result["duration"] == 90.0
+    assert result["other"] == str(object)
+
+
+def test_encode_tool_result_truncated() -> None:
+    """Test results over the limit are cut and marked."""
+    result = encode_tool_result({"value": "x" * 100}, 20)
+
+    assert len(result.split("...")[0].encode()) == 20
+    assert result.endswith("[truncated 92 bytes]")
+
+
+def _utc(*args: int) -> datetime:
+    return datetime(*args, tzinfo=dt_util.UTC)
+
+
+def test_summary_segments_aligned() -> None:
+    """Test ranges of whole months or days use a single period."""
+    assert summary_segments(_utc(2024, 1, 1), _utc(2024, 3, 1)) == [
+        (_utc(2024, 1, 1), _utc(2024, 3, 1), "month")
+    ]
+    assert summary_segments(_utc(2024, 1, 30), _utc(2024, 2, 2)) == [
+        (_utc(2024, 1, 30), _utc(2024, 2, 2), "day")
+    ]
+    assert summary_segments(_utc(2024, 1, 1, 10), _utc(2024, 1, 1, 13)) == [
+        (_utc(2024, 1, 1, 10), _utc(2024, 1, 1, 13), "hour")
+    ]
+
+
+def test_summary_segments_partial_hours() -> None:
+    """Test partial hours at either end use 5-minute statistics."""
+    assert summary_segments(_utc(2024, 1, 1, 10, 20), _utc(2024, 1, 1, 13, 40)) == [
+        (_utc(2024, 1, 1, 10, 20), _utc(2024, 1, 1, 11), "5minute"),
+        (_utc(2024, 1, 1, 11), _utc(2024, 1, 1, 13), "hour"),
+        (_utc(2024, 1, 1, 13), _utc(2024, 1, 1, 13, 40), "5minute"),
+    ]
+    assert summary_segments(_utc(2024, 1, 1, 10), _utc(2024, 1, 1, 12, 30)) == [
+        (_utc(2024, 1, 1, 10), _utc(2024, 1, 1, 12), "hour"),
+        (_utc(2024, 1, 1, 12), _utc(2024, 1, 1, 12, 30), "5minute"),
+    ]
+    assert summary_segments(_utc(2024, 1, 1, 10, 20), _utc(2024, 1, 1, 10, 50)) == [
+        (_utc(2024, 1, 1, 10, 20), _utc(2024, 1, 1, 10, 50), "5minute")
+    ]
+
+
+class FakeServices:
+    """Record service calls, each call yields to the loop before it ends."""
+
+    def __init__(self, fail: set[str] = frozenset()) -> None:
+        """Initialize the recorder."""
+        self.log: list[tuple[str, str, Any]] = []
+        self.fail = fail
+
+    def has_service(self, domain: str, service: str) -> bool:
+        """Return True for every service."""
+        return True
+
+    async def async_call(
+        self, domain: str, service: str, service_data: dict, blocking: bool = False
+    ) -> None:
+        """Run a call, in the background unless blocking like Home Assistant."""
+        call = self._execute(service, service_data)
+        if not blocking:
+            asyncio.get_running_loop().create_task(call)
+            return
+        await call
+
+    async def _execute(self, service: str, service_data: dict) -> None:
+        target = service_data["entity_id"] or service_data.get("area_id")
+        self.log.append(("start", service, target))
+        for _ in range(3):
+            await asyncio.sleep(0)
+        self.log.append(("end", service, target))
+        if service in self.fail:
+            raise HomeAssistantError(f"{service} failed")
+
+
+class FakeHass:
+    """Provide the parts of Home Assistant execute_service uses."""
+
+    def __init__(self, services: FakeServices) -> None:
+        """Initialize with every light existing."""
+        self.services = services
+        self.states = SimpleNamespace(get=lambda entity_id: object())
+
+    def async_create_task(self, target):
+        """Schedule a coroutine on the running loop."""
+        return asyncio.get_running_loop().create_task(target)
+
+
+EXPOSED = [
+    {"entity_id": "light.kitchen"},
+    {"entity_id": "light.hall"},
+    {"entity_id": "light.porch"},
+]
+
+
+def _execute_service(services: FakeServices, calls: list[dict]) -> list[dict]:
+    async def execute():
+        return await NativeFunctionExecutor().execute_service(
+            FakeHass(services), {}, {"list": calls}, None, EXPOSED
+        )
+
+    return asyncio.run(execute())
+
+
+def _call(service: str, **service_data: Any) -> dict:
+    return {"domain": "light", "service": service, "service_data": service_data}
+
+
+def test_execute_service_same_entity_in_order() -> None:
+    """Test different services on one entity run one after another."""
+    services = FakeServices()
+
+    _execute_service(
+        services,
+        [
+            _call("turn_on", entity_id="light.kitchen"),
+            _call("turn_off", entity_id="light.kitchen"),
+        ],
+    )
+
+    assert services.log == [
+        ("start", "turn_on", ["light.kitchen"]),
+        ("end", "turn_on", ["light.kitchen"]),
+        ("start", "turn_off", ["light.kitchen"]),
+        ("end", "turn_off", ["light.kitchen"]),
+    ]
+
+
+def test_execute_service_merge() -> None:
+    """Test calls only differing by entity are merged and run concurrently."""
+    services = FakeServices()
+
+    _execute_service(
+        services,
+        [
+            _call("turn_on", entity_id="light.kitchen", brightness=10),
+            _call("turn_off", entity_id="light.porch"),
+            _call("turn_on", entity_id="light.hall", brightness=10),
+        ],
+    )
+
+    assert services.log[:2] == [
+        ("start", "turn_on", ["light.kitchen", "light.hall"]),
+        ("start", "turn_off", ["light.porch"]),
+    ]
+    assert len(services.log) == 4
+
+
+def test_execute_service_merge_blocked() -> None:
+    """Test a call is not merged past a call in between on the same entity."""
+    services = FakeServices()
+
+    _execute_service(
+        services,
+        [
+            _call("turn_on", entity_id="light.kitchen"),
+            _call("turn_off", entity_id="light.kitchen"),
+            _call("turn_on", entity_id="light.kitchen"),
+        ],
+    )
+
+    assert [(event, service) for event, service, _ in services.log] == [
+        ("start", "turn_on"),
+        ("end", "turn_on"),
+        ("start", "turn_off"),
+        ("end", "turn_off"),
+        ("start", "turn_on"),
+        ("end", "turn_on"),
+    ]
+
+
+def test_execute_service_area_serialized() -> None:
+    """Test calls by area or device wait for and block every other call."""
+    services = FakeServices()
+
+    _execute_service(
+        services,
+        [
+            _call("turn_on", entity_id="light.kitchen"),
+            _call("turn_off", area_id="living_room"),
+            _call("turn_on", entity_id="light.hall"),
+            _call("turn_off", device_id="abc123"),
+        ],
+    )
+
+    assert [(event, service) for event, service, _ in services.log] == [
+        ("start", "turn_on"),
+        ("end", "turn_on"),
+        ("start", "turn_off"),
+        ("end", "turn_off"),
+        ("start", "turn_on"),
+        ("end", "turn_on"),
+        ("start", "turn_off"),
+        ("end", "turn_off"),
+    ]
+
+
+def test_execute_service_results() -> None:
+    """Test every requested call gets the result of the call it was merged into."""
+    services = FakeServices(fail={"toggle"})
+
+    results = _execute_service(
+        services,
+        [
+            _call("turn_on", entity_id="light.kitchen"),
+            _call("toggle", entity_id="light.porch"),
+            _call("turn_on", entity_id="light.hall"),
+        ],
+    )
+
+    assert results == [
+        {"success": True},
+        {"error": "toggle failed"},
+        {"success": True},
+    ]
+    assert ("start", "turn_on", ["light.kitchen", "light.hall"]) in services.log
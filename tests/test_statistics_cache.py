@@ -0,0 +1,209 @@
+"""Tests for the statistics cache."""
+
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import homeassistant.util.dt as dt_util
+
+from custom_components.ha_openai_energy_agent.statistics_cache import (
+    StatisticsCache,
+    _missing_ranges,
+    period_end,
+    period_start,
+)
+
+HOUR = 3600
+
+
+@pytest.fixture(autouse=True)
+def time_zone():
+    """Use a time zone with daylight saving time."""
+    dt_util.set_default_time_zone(dt_util.get_time_zone("Europe/Amsterdam"))
+    yield
+    dt_util.set_default_time_zone(dt_util.UTC)
+
+
+def _local(*args: int) -> float:
+    return datetime(*args, tzinfo=dt_util.DEFAULT_TIME_ZONE).timestamp()
+
+
+def test_period_day_dst() -> None:
+    """Test days are 23 and 25 hours long when the clocks change."""
+    spring = _local(2024, 3, 31)
+    autumn = _local(2024, 10, 27)
+
+    assert period_start(_local(2024, 3, 31, 12), "day") == spring
+    assert period_end(spring, "day") - spring == 23 * HOUR
+    assert period_start(_local(2024, 10, 27, 23, 30), "day") == autumn
+    assert period_end(autumn, "day") - autumn == 25 * HOUR
+
+
+def test_period_month_and_week() -> None:
+    """Test months end on the last day and weeks start on Monday."""
+    assert period_start(_local(2024, 1, 31, 23, 59), "month") == _local(2024, 1, 1)
+    assert period_end(_local(2024, 1, 1), "month") == _local(2024, 2, 1)
+    assert period_end(_local(2024, 2, 1), "month") == _local(2024, 3, 1)
+    # October has the autumn clock change
+    assert period_end(_local(2024, 10, 1), "month") == _local(2024, 11, 1)
+    assert period_end(_local(2024, 12, 1), "month") == _local(2025, 1, 1)
+    assert period_start(_local(2024, 4, 4, 8), "week") == _local(2024, 4, 1)
+    assert period_end(_local(2024, 3, 25), "week") == _local(2024, 4, 1)
+
+
+def test_period_fixed() -> None:
+    """Test hours and 5 minutes are aligned to UTC."""
+    assert period_start(_local(2024, 3, 31, 3, 59), "hour") == _local(2024, 3, 31, 3)
+    assert period_start(1000, "5minute") == 900
+    assert period_end(900, "5minute") == 1200
+
+
+def test_missing_ranges() -> None:
+    """Test uncached buckets are merged into contiguous ranges."""
+    buckets = [0, HOUR, 2 * HOUR, 3 * HOUR, 4 * HOUR, 5 * HOUR]
+    # A bucket cached as empty is not missing
+    rows = {HOUR: {"start": HOUR}, 4 * HOUR: None}
+
+    assert _missing_ranges(rows, buckets, "hour") == [
+        (0, HOUR),
+        (2 * HOUR, 4 * HOUR),
+        (5 * HOUR, 6 * HOUR),
+    ]
+
+
+class FakeRecorder:
+    """Answer statistics queries with one row per bucket and log the ranges."""
+
+    def __init__(self) -> None:
+        """Initialize the log."""
+        self.fetched: list[tuple[float, float, frozenset[str]]] = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def async_add_executor_job(
+        self, target, hass, start_time, end_time, statistic_ids, period, units, types
+    ):
+        """Return a row for every bucket of the range."""
+        start = start_time.timestamp()
+        end = end_time.timestamp()
+        self.fetched.append((start, end, frozenset(statistic_ids)))
+        await self.release.wait()
+        rows = []
+        bucket = period_start(start, period)
+        while bucket < end:
+            rows.append({"start": bucket, "change": 1.0})
+            bucket = period_end(bucket, period)
+        return {statistic_id: rows for statistic_id in statistic_ids}
+
+
+def _get(cache: StatisticsCache, start: float, end: float, period: str = "day"):
+    return cache.async_get(
+        dt_util.utc_from_timestamp(start),
+        dt_util.utc_from_timestamp(end),
+        ["sensor.grid_import"],
+        period,
+        None,
+        {"change"},
+    )
+
+
+async def _run(test) -> FakeRecorder:
+    fake_recorder = FakeRecorder()
+    cache = StatisticsCache(SimpleNamespace(loop=asyncio.get_running_loop()))
+    with patch(
+        "custom_components.ha_openai_energy_agent.statistics_cache.recorder"
+        ".get_instance",
+        return_value=fake_recorder,
+    ):
+        await test(cache, fake_recorder)
+    return fake_recorder
+
+
+def test_overlapping_requests_fetch_missing_buckets() -> None:
+    """Test a request overlapping a cached one only fetches the other buckets."""
+
+    async def test(cache: StatisticsCache, fake_recorder: FakeRecorder) -> None:
+        await _get(cache, _local(2024, 3, 1), _local(2024, 3, 3))
+        result = await _get(cache, _local(2024, 3, 2), _local(2024, 3, 5))
+
+        assert [row["start"] for row in result["sensor.grid_import"]] == [
+            _local(2024, 3, 2),
+            _local(2024, 3, 3),
+            _local(2024, 3, 4),
+        ]
+
+    fake_recorder = asyncio.run(_run(test))
+
+    assert [(start, end) for start, end, _ in fake_recorder.fetched] == [
+        (_local(2024, 3, 1), _local(2024, 3, 3)),
+        (_local(2024, 3, 3), _local(2024, 3, 5)),
+    ]
+
+
+def test_partial_buckets_fetched_again() -> None:
+    """Test partial buckets at either end are fetched on every request."""
+
+    async def test(cache: StatisticsCache, fake_recorder: FakeRecorder) -> None:
+        for _ in range(2):
+            result = await _get(cache, _local(2024, 3, 1, 6), _local(2024, 3, 4, 12))
+
+            assert [row["start"] for row in result["sensor.grid_import"]] == [
+                _local(2024, 3, 1),
+                _local(2024, 3, 2),
+                _local(2024, 3, 3),
+                _local(2024, 3, 4),
+            ]
+
+    fake_recorder = asyncio.run(_run(test))
+
+    head = (_local(2024, 3, 1, 6), _local(2024, 3, 2))
+    tail = (_local(2024, 3, 4), _local(2024, 3, 4, 12))
+    assert sorted((start, end) for start, end, _ in fake_recorder.fetched) == sorted(
+        [head, (_local(2024, 3, 2), _local(2024, 3, 4)), tail, head, tail]
+    )
+
+
+def test_recent_buckets_not_cached() -> None:
+    """Test buckets the recorder may still compile are fetched every time."""
+    now = _local(2024, 3, 1, 12, 5)
+
+    async def test(cache: StatisticsCache, fake_recorder: FakeRecorder) -> None:
+        for _ in range(2):
+            await _get(cache, _local(2024, 3, 1, 10), now, "hour")
+
+    with patch.object(dt_util, "utcnow", return_value=dt_util.utc_from_timestamp(now)):
+        fake_recorder = asyncio.run(_run(test))
+
+    # 11:00 to 12:00 ended less than 15 minutes ago
+    assert [(start, end) for start, end, _ in fake_recorder.fetched] == [
+        (_local(2024, 3, 1, 10), _local(2024, 3, 1, 11)),
+        (_local(2024, 3, 1, 11), now),
+        (_local(2024, 3, 1, 11), now),
+    ]
+
+
+def test_inflight_requests_coalesced() -> None:
+    """Test identical requests running at the same time share one query."""
+
+    async def test(cache: StatisticsCache, fake_recorder: FakeRecorder) -> None:
+        fake_recorder.release.clear()
+        requests = asyncio.gather(
+            _get(cache, _local(2024, 3, 1), _local(2024, 3, 3)),
+            _get(cache, _local(2024, 3, 1), _local(2024, 3, 3)),
+        )
+        # Let both requests reach the recorder before the query returns
+        while not fake_recorder.fetched:
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        fake_recorder.release.set()
+        first, second = await requests
+
+        assert first == second
+        assert len(first["sensor.grid_import"]) == 2
+
+    fake_recorder = asyncio.run(_run(test))
+
+    assert len(fake_recorder.fetched) == 1